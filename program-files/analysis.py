@@ -0,0 +1,113 @@
+import cell
+import numpy as np
+
+# Everything here works on connect_vector arrays, so a maze can come from a CellGrid, a maze file or a batch result.
+# The maze is a spanning tree: every cell but the root points at its parent through its connect vector.
+
+# parent_array returns the flat index of every cell's parent, -1 for the root
+def parent_array(connect_vector: np.ndarray) -> np.ndarray:
+    flat = connect_vector.reshape(-1)
+    parents = np.arange(flat.size, dtype=np.int64) + cell.direction_offsets(connect_vector.shape)[flat]
+    parents[flat < 0] = -1
+    return parents
+
+# distance_array returns the number of steps from start to every cell of the maze, -1 for cells it can't reach.
+# It is a breadth first search that takes a whole level of the tree per pass, so each cell is handled once
+def distance_array(connect_vector: np.ndarray, start=(0, 0, 0), passages=None) -> np.ndarray:
+    if passages is None:
+        passages = cell.passage_mask(connect_vector)
+    flat = passages.reshape(-1)
+    offsets = cell.direction_offsets(connect_vector.shape)
+
+    distances = np.full(flat.size, -1, dtype=np.int32)
+    frontier = np.array([np.ravel_multi_index(start, connect_vector.shape)], dtype=np.int64)
+    distances[frontier] = 0
+
+    level = 0
+    while frontier.size:
+        level += 1
+
+        # step through every open passage of the frontier; open passages never lead off the grid
+        steps = [frontier[(flat[frontier] >> direction) & 1 == 1] + offsets[direction] for direction in range(6)]
+        frontier = np.concatenate(steps)
+        frontier = frontier[distances[frontier] < 0]
+        distances[frontier] = level
+
+    return distances
+
+# depth_array returns the depth of every cell below the root at (0,0,0), in the grid's shape
+def depth_array(connect_vector: np.ndarray) -> np.ndarray:
+    return distance_array(connect_vector).reshape(connect_vector.shape)
+
+# solution_path returns the cells on the way from start to goal, both included. The default goal is the far corner,
+# the one the game asks the player to reach. The way is unique, so it is found by climbing parent pointers from both
+# ends until they meet
+def solution_path(connect_vector: np.ndarray, start=(0, 0, 0), goal=None) -> list:
+    if goal is None:
+        goal = tuple(length - 1 for length in connect_vector.shape)
+    parents = parent_array(connect_vector)
+
+    # every ancestor of start, remembering how far up it is
+    start_index = int(np.ravel_multi_index(start, connect_vector.shape))
+    climb = [start_index]
+    while parents[climb[-1]] >= 0:
+        climb.append(int(parents[climb[-1]]))
+    position = {index: steps for (steps, index) in enumerate(climb)}
+
+    # climb from the goal until one of them is reached
+    descent = [int(np.ravel_multi_index(goal, connect_vector.shape))]
+    while descent[-1] not in position:
+        descent.append(int(parents[descent[-1]]))
+
+    path = climb[:position[descent[-1]]] + descent[::-1]
+    return [tuple(int(x) for x in np.unravel_index(index, connect_vector.shape)) for index in path]
+
+# MazeStats holds the numbers that describe one maze
+class MazeStats:
+
+    def __init__(self, shape, solution_length, dead_ends, junctions, branching_factor, max_depth, mean_depth,
+                 longest_path, longest_path_ends) -> None:
+        self.shape = shape
+        self.solution_length = solution_length      # moves from start to goal
+        self.dead_ends = dead_ends                  # cells with a single open passage
+        self.junctions = junctions                  # cells with three or more open passages
+        self.branching_factor = branching_factor    # average children of the cells that have any
+        self.max_depth = max_depth                  # moves from the root to the deepest cell
+        self.mean_depth = mean_depth
+        self.longest_path = longest_path            # moves between the two cells furthest apart (the tree diameter)
+        self.longest_path_ends = longest_path_ends
+
+    def __str__(self) -> str:
+        return "\n".join((
+            f"shape:            {'x'.join(str(length) for length in self.shape)}",
+            f"solution length:  {self.solution_length}",
+            f"dead ends:        {self.dead_ends}",
+            f"junctions:        {self.junctions}",
+            f"branching factor: {self.branching_factor:.3f}",
+            f"max depth:        {self.max_depth}",
+            f"mean depth:       {self.mean_depth:.2f}",
+            f"longest path:     {self.longest_path} {self.longest_path_ends[0]} -> {self.longest_path_ends[1]}",
+        ))
+
+# analyze works out the MazeStats of a finished maze in time linear in its number of cells
+def analyze(connect_vector: np.ndarray, start=(0, 0, 0), goal=None) -> MazeStats:
+    shape = connect_vector.shape
+    passages = cell.passage_mask(connect_vector)
+    degree = cell.MASK_BIT_COUNT[passages]
+
+    # every cell but the root has a parent, and the children of a cell are its passages other than the parent one
+    children = degree - (connect_vector >= 0)
+    parents_with_children = np.count_nonzero(children)
+    branching_factor = children.sum() / parents_with_children if parents_with_children else 0.0
+
+    depth = distance_array(connect_vector, passages=passages)
+
+    # the cell furthest from the root is one end of a longest path, and the cell furthest from it is the other end
+    far_end = int(np.argmax(depth))
+    far_end = tuple(int(x) for x in np.unravel_index(far_end, shape))
+    from_far_end = distance_array(connect_vector, far_end, passages)
+    other_end = tuple(int(x) for x in np.unravel_index(int(np.argmax(from_far_end)), shape))
+
+    return MazeStats(shape, len(solution_path(connect_vector, start, goal)) - 1,
+                     int(np.count_nonzero(degree == 1)), int(np.count_nonzero(degree >= 3)), float(branching_factor),
+                     int(depth.max()), float(depth.mean()), int(from_far_end.max()), (far_end, other_end))
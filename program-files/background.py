@@ -0,0 +1,135 @@
+import cell
+import numpy as np
+import threading
+import time
+
+# GridSnapshot is what the renderer sees of a grid that is being generated on a BackgroundGenerator: the states and
+# connect vectors as they were after the last published iteration. It keeps its own copy of the grid's log of
+# connected cells, to which each publish adds only the new entries, so line_endpoints still only works out the new
+# lines. The grid's own log can't be shared: merge_forest rewrites it in place while the renderer may be reading it
+class GridSnapshot(cell.CellGrid):
+
+    def __init__(self, cellgrid: cell.CellGrid) -> None:
+        self.dim = cellgrid.dim
+        self.shape = cellgrid.shape
+        self.state = cellgrid.state_array().copy()
+        self.connect_vector = cellgrid.connect_array().copy()
+        self.connections = cellgrid.connections.copy()
+        self.connection_count = cellgrid.connection_count
+        self.geometry_version = cellgrid.geometry_version
+        self.root_count = len(cellgrid.roots)
+        self.lines = None
+        self.lines_built = 0
+
+        # update_grid calls made on the grid so far, and whether they have connected every cell
+        self.iterations = 0
+        self.finished = cellgrid.finished
+
+    def state_array(self) -> np.ndarray:
+        return self.state
+
+    def connect_array(self) -> np.ndarray:
+        return self.connect_vector
+
+    # connected_count is the number of cells that are part of the maze: the roots and every cell with a parent
+    @property
+    def connected_count(self) -> int:
+        return self.connection_count + self.root_count
+
+    @property
+    def cell_count(self) -> int:
+        return self.state.size
+
+# BackgroundGenerator runs update_grid on a worker thread, so a slow iteration never holds up the window. The worker
+# works on the grid itself and publishes it to the snapshot through a second pair of arrays: it copies the grid into
+# the back arrays, then swaps them with the snapshot's. The renderer holds lock while it reads the snapshot, and the
+# worker only waits for the lock when it is about to go idle; otherwise it skips the swap and carries on
+class BackgroundGenerator:
+
+    def __init__(self, cellgrid: cell.CellGrid) -> None:
+        self.cellgrid = cellgrid
+        self.snapshot = GridSnapshot(cellgrid)
+        self.back_state = self.snapshot.state.copy()
+        self.back_connect_vector = self.snapshot.connect_vector.copy()
+        self.lock = threading.Lock()
+
+        # what the worker has been asked to do: single iterations, or every iteration until the maze is finished
+        self.wake = threading.Condition()
+        self.pending = 0
+        self.until_done = False
+        self.stopped = False
+
+        # iterations run and seconds spent on them by the worker
+        self.iterations = 0
+        self.seconds = 0.0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # step asks for one more iteration, unless the last one asked for hasn't been run yet
+    def step(self) -> None:
+        with self.wake:
+            self.pending = 1
+            self.wake.notify()
+
+    # run_until_done keeps the worker iterating until every cell is connected
+    def run_until_done(self) -> None:
+        with self.wake:
+            self.until_done = True
+            self.wake.notify()
+
+    # busy tells whether the worker has iterations left to run
+    @property
+    def busy(self) -> bool:
+        return not self.cellgrid.finished and (self.pending > 0 or self.until_done)
+
+    # stop ends the worker thread once the iteration it is running is over
+    def stop(self) -> None:
+        with self.wake:
+            self.stopped = True
+            self.wake.notify()
+        self.thread.join()
+
+    def run(self) -> None:
+        while True:
+            with self.wake:
+                while not self.stopped and not self.busy:
+                    self.wake.wait()
+                if self.stopped:
+                    return
+                self.pending = max(self.pending - 1, 0)
+
+            start = time.perf_counter()
+            if self.cellgrid.update_grid():
+                self.cellgrid.finished = True
+            self.seconds += time.perf_counter() - start
+            self.iterations += 1
+
+            with self.wake:
+                going_idle = not self.busy
+            self.publish(wait=going_idle)
+
+    # publish copies the grid into the back arrays and swaps them into the snapshot. Without wait, the swap is
+    # skipped when the renderer is reading the snapshot, to be done after a later iteration
+    def publish(self, wait) -> None:
+        np.copyto(self.back_state, self.cellgrid.state_array())
+        np.copyto(self.back_connect_vector, self.cellgrid.connect_array())
+        if not self.lock.acquire(blocking=wait):
+            return
+
+        snapshot = self.snapshot
+        (snapshot.state, self.back_state) = (self.back_state, snapshot.state)
+        (snapshot.connect_vector, self.back_connect_vector) = (self.back_connect_vector, snapshot.connect_vector)
+        if snapshot.geometry_version != self.cellgrid.geometry_version:
+            np.copyto(snapshot.connections, self.cellgrid.connections)
+            snapshot.geometry_version = self.cellgrid.geometry_version
+            snapshot.lines = None
+            snapshot.lines_built = 0
+        else:
+            published = slice(snapshot.connection_count, self.cellgrid.connection_count)
+            snapshot.connections[published] = self.cellgrid.connections[published]
+        snapshot.connection_count = self.cellgrid.connection_count
+        snapshot.root_count = len(self.cellgrid.roots)
+        snapshot.iterations = self.iterations
+        snapshot.finished = self.cellgrid.finished
+        self.lock.release()
@@ -0,0 +1,105 @@
+import argparse
+import cell
+import functools
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# MazeResult is one finished maze from a batch, carrying only its connect_vector array as raw bytes
+class MazeResult:
+
+    def __init__(self, shape, seed, connect_vector: bytes, iterations, seconds) -> None:
+        self.shape = shape
+        self.seed = seed
+        self.connect_vector = connect_vector
+        self.iterations = iterations
+        self.seconds = seconds
+
+    # connect_array turns the raw bytes back into an array of the maze's shape, without copying them
+    def connect_array(self) -> np.ndarray:
+        return np.frombuffer(self.connect_vector, dtype=np.int8).reshape(self.shape)
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.connect_vector)
+
+    @property
+    def cells_per_second(self) -> float:
+        return self.cell_count / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (f"{'x'.join(str(length) for length in self.shape)} seed {self.seed}: "
+                f"{self.iterations} iterations in {self.seconds:.3f}s "
+                f"({self.cells_per_second:,.0f} cells/s)")
+
+# BatchReport sums up the throughput of a whole batch
+class BatchReport:
+
+    def __init__(self, results: list, workers, seconds) -> None:
+        self.workers = workers
+        self.seconds = seconds
+        self.mazes = len(results)
+        self.cells = sum(result.cell_count for result in results)
+
+        # time spent inside the workers, as opposed to the wall clock time of the batch
+        self.worker_seconds = sum(result.seconds for result in results)
+
+    @property
+    def mazes_per_second(self) -> float:
+        return self.mazes / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def cells_per_second(self) -> float:
+        return self.cells / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return (f"{self.mazes} mazes on {self.workers} workers in {self.seconds:.3f}s: "
+                f"{self.mazes_per_second:,.2f} mazes/s, {self.cells_per_second:,.0f} cells/s, "
+                f"{self.worker_seconds:.3f}s of worker time")
+
+# generate_job builds a single (dim, seed) maze, dim being the side of a cube or a (depth, height, width) shape;
+# it runs inside the worker processes
+def generate_job(job: tuple, engine, fast_reseed=False) -> MazeResult:
+    (dim, seed) = job
+    cellgrid = cell.ArrayCellGrid(dim, engine=engine, seed=seed, fast_reseed=fast_reseed)
+    (iterations, seconds) = cellgrid.generate()
+    return MazeResult(cellgrid.shape, seed, cellgrid.connect_vector.tobytes(), iterations, seconds)
+
+# generate_batch fans a list of (dim, seed) jobs out over a process pool. The results come back in job order,
+# together with a BatchReport of the whole run
+def generate_batch(jobs: list, workers=None, engine="frontier", fast_reseed=False) -> tuple:
+    workers = workers or os.cpu_count() or 1
+
+    # hand each worker several jobs at a time so thousands of small mazes don't pay for a round trip each
+    chunksize = max(1, len(jobs) // (workers * 4))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        job = functools.partial(generate_job, engine=engine, fast_reseed=fast_reseed)
+        results = list(executor.map(job, jobs, chunksize=chunksize))
+
+    return (results, BatchReport(results, workers, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a batch of mazes and report the throughput.")
+    parser.add_argument("--dim", type=int, default=10, help="dimension of every maze")
+    parser.add_argument("--shape", type=int, nargs=3, metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                        help="build every maze with this shape instead of a cube")
+    parser.add_argument("--count", type=int, default=100, help="number of mazes to generate")
+    parser.add_argument("--first-seed", type=int, default=0, help="seed of the first maze, the rest count up from it")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--engine", choices=cell.ENGINES, default="frontier")
+    parser.add_argument("--fast-reseed", action="store_true", help="sample reseeds from the boundary (frontier only)")
+    parser.add_argument("--verbose", action="store_true", help="print every maze as well as the totals")
+    args = parser.parse_args()
+
+    dim = tuple(args.shape) if args.shape else args.dim
+    jobs = [(dim, seed) for seed in range(args.first_seed, args.first_seed + args.count)]
+    (results, report) = generate_batch(jobs, args.workers, args.engine, args.fast_reseed)
+
+    if args.verbose:
+        for result in results:
+            print(result)
+    print(report)
@@ -0,0 +1,172 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+# the rendering benchmarks draw into a window that never shows, so they run without a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import cell
+import game
+import jit
+import numpy as np
+import pygame
+
+DIMENSIONS = (5, 10, 20, 32, 64)
+
+# the grids being measured: "cellgrid" is the original CellGrid of Cell objects, the rest are ArrayCellGrid engines,
+# "fast-reseed" being the frontier engine sampling its reseeds
+BACKENDS = ("cellgrid",) + cell.ENGINES + ("fast-reseed",)
+
+# the scalar backends visit every cell in Python, so by default they stop at this dimension. Without numba the
+# "jit" engine is the scalar engine under another name
+MAX_SCALAR_DIM = 20
+SCALAR_BACKENDS = ("cellgrid", "scalar") + (() if jit.available else ("jit",))
+
+# make_grid builds an empty grid for one of the BACKENDS
+def make_grid(backend, dim, seed) -> cell.CellGrid:
+    if backend == "cellgrid":
+        return cell.CellGrid(dim, seed=seed)
+    if backend == "fast-reseed":
+        return cell.ArrayCellGrid(dim, engine="frontier", seed=seed, fast_reseed=True)
+    return cell.ArrayCellGrid(dim, engine=backend, seed=seed)
+
+# best_time runs function repeat times and returns the fastest run in seconds
+def best_time(function, repeat) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# peak_memory runs function once more under tracemalloc and returns the most memory it had allocated at once
+def peak_memory(function) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# new_angles gives a different view angle every time, so the projection caches in game.py don't hide the work
+def new_angles():
+    return (0.01 * step for step in itertools.count())
+
+# Benchmark runs the benchmarks and collects one record per benchmark, backend and dimension
+class Benchmark:
+
+    def __init__(self, repeat, seed, memory, iterations) -> None:
+        self.repeat = repeat
+        self.seed = seed
+        self.memory = memory
+        self.iterations = iterations
+        self.records = []
+
+    def record(self, name, backend, dim, seconds, peak_bytes=None, iterations=None) -> None:
+        self.records.append({"benchmark": name, "backend": backend, "dim": dim, "seconds": seconds,
+                             "peak_bytes": peak_bytes, "iterations": iterations})
+        print(f"{name:<22} {backend:<11} {dim:>4} {seconds * 1000:>12.3f} ms"
+              + (f" {peak_bytes / 2 ** 20:>10.2f} MiB" if peak_bytes is not None else " " * 15)
+              + (f" {iterations:>8} iterations" if iterations is not None else ""))
+
+    # timed measures a function that needs no fresh state between runs
+    def timed(self, name, backend, dim, function) -> None:
+        self.record(name, backend, dim, best_time(function, self.repeat),
+                    peak_memory(function) if self.memory else None)
+
+    # generation measures building a grid, single update_grid iterations and whole runs to completion. It returns
+    # one finished grid for the benchmarks that need a maze
+    def generation(self, backend, dim) -> cell.CellGrid:
+        self.timed("CellGrid.__init__", backend, dim, lambda: make_grid(backend, dim, self.seed))
+
+        # the first iterations of a fresh grid, timed one at a time
+        cellgrid = make_grid(backend, dim, self.seed)
+        times = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            cellgrid.update_grid()
+            times.append(time.perf_counter() - start)
+        self.record("update_grid", backend, dim, float(np.mean(times)), iterations=len(times))
+
+        # run to completion, the time coming from generate itself
+        runs = []
+        for _ in range(self.repeat):
+            cellgrid = make_grid(backend, dim, self.seed)
+            runs.append(cellgrid.generate())
+        (iterations, seconds) = min(runs, key=lambda run: run[1])
+        peak_bytes = None
+        if self.memory:
+            peak_bytes = peak_memory(lambda: make_grid(backend, dim, self.seed).generate())
+        self.record("generate", backend, dim, seconds, peak_bytes, iterations)
+        return cellgrid
+
+    # play measures what the game does with a finished maze
+    def play(self, cellgrid, dim) -> None:
+        self.timed("generate_legal_moves", "-", dim, lambda: game.generate_legal_moves(cellgrid))
+
+        angles = new_angles()
+        points = game.generate_points_list(dim)
+        self.timed("get_2d_points", "-", dim, lambda: game.get_2d_points(points, dim, next(angles), 0.5, 0))
+        angles = new_angles()
+        self.timed("get_2d_skeleton", "-", dim, lambda: game.get_2d_skeleton(cellgrid, next(angles), 0.5, 0))
+        self.timed("get_2d_skeleton cached", "-", dim, lambda: game.get_2d_skeleton(cellgrid, 0, 0.5, 0))
+
+    # render measures drawing a frame of each view onto the dummy display
+    def render(self, cellgrid, dim) -> None:
+        points = game.get_2d_points(game.generate_points_list(dim), dim, 0, 0.5, 0)
+        self.timed("draw_grid_numbers", "-", dim, lambda: game.draw_grid_numbers(cellgrid, points))
+
+        angles = new_angles()
+        self.timed("draw_grid_skeletal", "-", dim,
+                   lambda: game.draw_grid_skeletal(cellgrid, next(angles), 0.5, 0, True, (0, 0, 0)))
+
+    def report(self) -> dict:
+        return {"python": platform.python_version(), "numpy": np.__version__, "pygame": pygame.version.ver,
+                "generator_version": cell.GENERATOR_VERSION, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "repeat": self.repeat, "seed": self.seed, "records": self.records}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time maze generation, legal moves and rendering.")
+    parser.add_argument("--dims", type=int, nargs="+", default=DIMENSIONS, help="grid dimensions to measure")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--max-scalar-dim", type=int, default=MAX_SCALAR_DIM,
+                        help="largest dimension for the cellgrid and scalar backends")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark, the best one counting")
+    parser.add_argument("--iterations", type=int, default=10, help="single update_grid iterations to time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra runs that measure peak memory")
+    parser.add_argument("--no-render", action="store_true", help="skip the pygame drawing benchmarks")
+    parser.add_argument("--json", help="write the results to this file as JSON")
+    args = parser.parse_args()
+
+    if not args.no_render:
+        pygame.init()
+        game.screen = pygame.display.set_mode((game.WINDOW_WIDTH, game.WINDOW_HEIGHT))
+        game.font = pygame.font.SysFont('arial', 20, True, False)
+
+    benchmark = Benchmark(args.repeat, args.seed, not args.no_memory, args.iterations)
+    for dim in args.dims:
+        finished = None
+        for backend in args.backends:
+            if backend in SCALAR_BACKENDS and dim > args.max_scalar_dim:
+                continue
+            finished = benchmark.generation(backend, dim)
+
+        if finished is not None:
+            benchmark.play(finished, dim)
+            if not args.no_render:
+                benchmark.render(finished, dim)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(benchmark.report(), file, indent=2)
+
+    if not args.no_render:
+        pygame.quit()
@@ -1,6 +1,10 @@
-from bitarray import bitarray
-from bitarray.util import int2ba
+import bisect
+import heapq
+import math
+import numpy as np
 import random
+import time
+import warnings
 
 #          /\ <->
 NORTH = (0,-1,0)
@@ -15,6 +19,179 @@ DIRECTIONS = [NORTH, EAST, UP, SOUTH, WEST, DOWN]
 BRANCH_PROB = 5
 TURN_PROB = 10
 
+# bumped whenever a change to the rules or to the order of the random draws changes the maze grown from a given seed
+GENERATOR_VERSION = 2
+
+# lookup tables over the 64 possible neighbor masks: how many bits are set, and the direction of the n-th set bit
+MASK_BIT_COUNT = np.array([bin(mask).count("1") for mask in range(64)], dtype=np.int8)
+MASK_NTH_DIRECTION = np.array([[d for d in range(6) if mask & (1 << d)] + [-1] * (6 - bin(mask).count("1"))
+                               for mask in range(64)], dtype=np.int8)
+
+# the same table for the scalar paths: the directions whose bits are set in each mask
+MASK_DIRECTIONS = tuple(tuple(d for d in range(6) if mask & (1 << d)) for mask in range(64))
+
+# the ways an ArrayCellGrid can run one iteration of update_grid; "jit" needs numba, see jit.py
+ENGINES = ("scalar", "vectorized", "frontier", "jit")
+
+# Rules are the parameters of the automaton's transitions: how often an inviter branches into a new seed, how often an
+# invitation goes straight on, and how much each direction is preferred when it doesn't. They are worked out into
+# lookup tables once, so the engines read a table where the plain rules would roll a uniform choice. Only these
+# parameters can be changed; the transitions themselves are the same in every engine, and a new kind of transition
+# still has to be written into each engine
+class Rules:
+
+    def __init__(self, branch_prob=BRANCH_PROB, turn_prob=TURN_PROB, axis_weights=(1, 1, 1), goal_bias=1) -> None:
+        for (name, prob) in (("branch_prob", branch_prob), ("turn_prob", turn_prob)):
+            if not 0 <= prob <= 100:
+                raise ValueError(f"{name} is a percentage, not {prob!r}")
+        # without a chance to branch, a grid that runs out of seeds can never reseed and would grow forever
+        if branch_prob == 0:
+            raise ValueError("branch_prob has to be above 0, or the maze can't finish growing")
+        if len(axis_weights) != 3 or min(axis_weights) <= 0 or goal_bias <= 0:
+            raise ValueError("axis_weights needs three positive weights and goal_bias has to be positive")
+
+        self.branch_prob = branch_prob
+        self.turn_prob = turn_prob
+        self.axis_weights = tuple(axis_weights)
+        self.goal_bias = goal_bias
+
+        # the weight of each direction: the weight of its (depth, height, width) axis, times goal_bias for east,
+        # south and down, the ways towards the goal in the far corner
+        self.weights = tuple(self.axis_weights[[abs(step) for step in DIRECTIONS[d]].index(1)]
+                             * (goal_bias if d % 2 == 1 else 1) for d in range(6))
+        self.uniform = len(set(self.weights)) == 1
+
+        # for every mask, the running total of the weights of its set bits in direction order, ending at exactly 1
+        self.cumulative = np.ones((64, 6))
+        for mask in range(1, 64):
+            totals = np.cumsum([self.weights[d] for d in MASK_DIRECTIONS[mask]])
+            self.cumulative[mask, :len(totals)] = totals / totals[-1]
+            self.cumulative[mask, len(totals) - 1] = 1
+        self.mask_cumulative = tuple(tuple(row[:MASK_BIT_COUNT[mask]].tolist())
+                                     for (mask, row) in enumerate(self.cumulative))
+
+    # choose picks one of the set bits of mask with the rules' weights, given a uniform number in [0, 1)
+    def choose(self, mask, uniform) -> int:
+        return MASK_DIRECTIONS[mask][bisect.bisect_right(self.mask_cumulative[mask], uniform)]
+
+    def __str__(self) -> str:
+        return (f"branch {self.branch_prob}%, straight {self.turn_prob}%, axis weights {self.axis_weights}, "
+                f"goal bias {self.goal_bias}")
+
+# the rules the automaton was written with, and that a grid uses unless it is given others
+DEFAULT_RULES = Rules()
+
+# grid_shape turns the size a grid is made with into its (depth, height, width) shape. A single number makes a cube,
+# and a depth of 1 makes a flat, two dimensional maze
+def grid_shape(size) -> tuple:
+    if np.ndim(size) == 0:
+        size = (size, size, size)
+    shape = tuple(int(length) for length in size)
+    if len(shape) != 3 or min(shape) < 1:
+        raise ValueError(f"a grid needs a size or a (depth, height, width) shape, not {size!r}")
+    return shape
+
+# direction_offsets returns how far the flat index moves for a step in each direction on a grid of this shape
+def direction_offsets(shape) -> np.ndarray:
+    (depth, height, width) = grid_shape(shape)
+    return np.array([i * height * width + j * width + k for (i, j, k) in DIRECTIONS], dtype=np.int64)
+
+# inside_mask returns a uint8 array of this shape holding, for every cell, the 6 bit mask of the directions in which
+# it has a neighbor on the grid. The neighbor in such a direction is at the flat index plus direction_offsets
+def inside_mask(shape) -> np.ndarray:
+    inside = np.full(grid_shape(shape), 63, dtype=np.uint8)
+    for (direction, change) in enumerate(DIRECTIONS):
+        # the layer of cells on the edge of the grid that the direction points off
+        axis = next(axis for axis in range(3) if change[axis] != 0)
+        edge = [slice(None)] * 3
+        edge[axis] = 0 if change[axis] < 0 else -1
+        inside[tuple(edge)] &= 63 ^ (1 << direction)
+    return inside
+
+# passage_mask returns a uint8 array of the same shape as connect_vector holding the open passages of every cell as
+# a 6 bit mask, bit n being set when the maze leads on from the cell in direction n, to its parent or to a child
+def passage_mask(connect_vector: np.ndarray) -> np.ndarray:
+    passages = np.zeros(connect_vector.shape, dtype=np.uint8)
+
+    for direction in range(6):
+        children = np.nonzero(connect_vector == direction)
+        parents = tuple(np.array(children) + np.array(DIRECTIONS[direction]).reshape(3, 1))
+
+        # each child opens the passage to its parent, and the parent the one back, no two children sharing it
+        passages[children] |= 1 << direction
+        passages[parents] |= 1 << (direction + 3) % 6
+
+    return passages
+
+# TickStats describes what one iteration of update_grid did, for the observer of a grid
+class TickStats:
+
+    def __init__(self, counts: np.ndarray, transitions: np.ndarray, seed_present, seconds, all_connected) -> None:
+        # number of cells in each state after the iteration
+        self.counts = counts
+
+        # transitions[a, b] is the number of cells that went from state a to state b, a == b counting those that stayed
+        self.transitions = transitions
+
+        # whether the iteration started with a live seed; without one, connected cells may reseed
+        self.seed_present = seed_present
+        self.seconds = seconds
+        self.all_connected = all_connected
+
+    # connected cells that became seeds again
+    @property
+    def reseeds(self) -> int:
+        return int(self.transitions[3, 1])
+
+    # disconnected cells that accepted an invitation
+    @property
+    def accepted(self) -> int:
+        return int(self.transitions[0, 1])
+
+    def __str__(self) -> str:
+        return (f"states {'/'.join(str(int(count)) for count in self.counts)}, {self.accepted} accepted, "
+                f"{self.reseeds} reseeds{'' if self.seed_present else ' (no live seed)'}, "
+                f"{self.seconds * 1000:.3f} ms")
+
+# TickLog is an observer that keeps the TickStats of every iteration, to look at how a grid converged
+class TickLog:
+
+    def __init__(self, verbose=False) -> None:
+        self.ticks = []
+        self.verbose = verbose
+
+    def __call__(self, cellgrid, stats: TickStats) -> None:
+        self.ticks.append(stats)
+        if self.verbose:
+            print(f"{len(self.ticks):>6}: {stats}")
+
+    # iterations that started without a live seed, where the grid waits on a connected cell to reseed
+    @property
+    def stalled(self) -> int:
+        return sum(not stats.seed_present for stats in self.ticks)
+
+    @property
+    def reseeds(self) -> int:
+        return sum(stats.reseeds for stats in self.ticks)
+
+    @property
+    def seconds(self) -> float:
+        return sum(stats.seconds for stats in self.ticks)
+
+    def __str__(self) -> str:
+        return (f"{len(self.ticks)} iterations, {self.stalled} without a live seed, {self.reseeds} reseeds, "
+                f"{self.seconds:.3f}s")
+
+# reroot makes index the root of the tree it is in, by reversing the connect vectors on the way up from it to the old
+# root. The connect vector of index itself is left for the caller to set
+def reroot(connect_vector: np.ndarray, offsets: np.ndarray, index) -> None:
+    path = [index]
+    while connect_vector[path[-1]] >= 0:
+        path.append(path[-1] + int(offsets[connect_vector[path[-1]]]))
+
+    for (child, parent) in reversed(list(zip(path, path[1:]))):
+        connect_vector[parent] = (connect_vector[child] + 3) % 6
+
 class Cell:
 
     def __init__(self) -> None:
@@ -27,25 +204,56 @@ class Cell:
         # Vector that points to the invited cell
         self.invite_vector = -1
 
-        # bitarray detecting all elible adjacent cells
-        self.neighbors = bitarray('000000')
+        # 6 bit mask of all elible adjacent cells, bit n being set when the cell in direction n is eligible
+        self.neighbors = 0
 
     def __str__(self) -> str:
-        return f"({self.state}, {self.connect_vector}, {self.invite_vector}, {self.neighbors})"
+        return f"({self.state}, {self.connect_vector}, {self.invite_vector}, {self.neighbors:06b})"
     
 class CellGrid:
 
-    def __init__(self, dim) -> None:
-        # Create an array of cells initialized to the value given in the grid
-        self.dim = dim
-        self.grid = [[[Cell() for i in range(self.dim)] for j in range(self.dim)] for k in range(self.dim)]
+    def __init__(self, dim, seed=None, rules=None, seeds=1) -> None:
+        # Create an array of cells initialized to the value given in the grid. dim is either the side of a cube or a
+        # (depth, height, width) shape; self.dim is the longest side
+        self.shape = grid_shape(dim)
+        self.dim = max(self.shape)
+        (depth, height, width) = self.shape
+        self.grid = [[[Cell() for k in range(width)] for j in range(height)] for i in range(depth)]
+
+        # the same cells in flat index order, with the directions in which each one has a neighbor
+        self.cells = [cell for plane in self.grid for row in plane for cell in row]
+        self.offsets = direction_offsets(self.shape).tolist()
+        self.inside = inside_mask(self.shape).reshape(-1).tolist()
 
-        # Choose a cell to the be starting seed
-        self.grid[0][0][0].state = 1
+        self.setup(seed, rules, seeds)
 
+    # setup gives a grid everything it needs to grow a maze besides its cells: random numbers, starting seeds, rules
+    # and the log of connected cells. Both kinds of grid call it once their cells are made
+    def setup(self, seed, rules, seeds) -> None:
         # state that the current state has a seed in it
         self.seed_present = True
-        
+
+        # Choose the cells to be the starting seeds, the one at (0,0,0) and seeds - 1 more. They are drawn by
+        # seed_random, and drawn again whenever it is called before the first iteration
+        self.seed_count = seeds
+        self.roots = []
+        self.started = False
+
+        # each grid draws from its own random numbers, so a grid built from a given seed always grows the same maze
+        self.seed_random(seed)
+
+        # the transition rules the grid grows by
+        self.rules = rules or DEFAULT_RULES
+
+        # set once update_grid reports that every cell is connected
+        self.finished = False
+
+        # called with the TickStats of every iteration when set, see observed_iterate
+        self.observer = None
+
+        # the log of connected cells that the line geometry is built from
+        self.reset_geometry()
+
     def __str__(self) -> str:
         s = ""
         for i in range(len(self.grid)):
@@ -56,93 +264,273 @@ class CellGrid:
             s += "\n\n"
         return s
 
-    # update_grid will go through an entire interation on the grid
+    # seed_random restarts the grid's random numbers from seed, or from the operating system when seed is None.
+    # Until the first iteration it also places the starting seeds again, so the maze depends on nothing but the seed
+    def seed_random(self, seed) -> None:
+        self.seed = seed
+        self.rng = random.Random(seed)
+        if not self.started:
+            self.write_states(self.roots, 0)
+            self.roots = self.place_seeds(self.seed_count)
+            self.write_states(self.roots, 1)
+
+    # state_array returns the state of every cell as an int8 array of the grid's shape
+    def state_array(self) -> np.ndarray:
+        return np.array([cell.state for cell in self.cells], dtype=np.int8).reshape(self.shape)
+
+    # connect_array returns the connect vector of every cell as an int8 array of the grid's shape
+    def connect_array(self) -> np.ndarray:
+        return np.array([cell.connect_vector for cell in self.cells], dtype=np.int8).reshape(self.shape)
+
+    # passage_array returns the open passages of every cell, see passage_mask
+    def passage_array(self) -> np.ndarray:
+        return passage_mask(self.connect_array())
+
+    # reset_geometry empties the log of connected cells and the line geometry built from it
+    def reset_geometry(self) -> None:
+        # flat indexes of the cells in the order they were given a connect vector; each cell is connected only once
+        self.connections = np.zeros(self.shape[0] * self.shape[1] * self.shape[2], dtype=np.int32)
+        self.connection_count = 0
+
+        # counts the times connect vectors were changed other than by connecting a new cell
+        self.geometry_version = 0
+
+        # model-space ends of the line from each logged cell to its parent, built on demand by line_endpoints
+        self.lines = None
+        self.lines_built = 0
+
+    # record_connection logs that the cell at a flat index has just been given its connect vector
+    def record_connection(self, index) -> None:
+        self.connections[self.connection_count] = index
+        self.connection_count += 1
+
+    # record_connections logs a whole array of newly connected flat indexes at once
+    def record_connections(self, indexes: np.ndarray) -> None:
+        self.connections[self.connection_count:self.connection_count + len(indexes)] = indexes
+        self.connection_count += len(indexes)
+
+    # rebuild_connections logs every cell that has a connect vector over again, for when connect vectors were set
+    # some other way than by update_grid. Any cached geometry of the grid has to be thrown away
+    def rebuild_connections(self) -> None:
+        indexes = np.flatnonzero(self.connect_array() >= 0)
+        self.connections[:len(indexes)] = indexes
+        self.connection_count = len(indexes)
+        self.geometry_version += 1
+        self.lines = None
+        self.lines_built = 0
+
+    # line_endpoints returns an N x 2 x 3 array with the grid coordinates of each connected cell and of its parent,
+    # in the order the cells were connected. Only the lines of cells connected since the last call are worked out
+    def line_endpoints(self) -> np.ndarray:
+        if self.lines is None:
+            self.lines = np.empty((len(self.connections), 2, 3), dtype=np.int32)
+
+        if self.lines_built < self.connection_count:
+            indexes = self.connections[self.lines_built:self.connection_count]
+            connect_vector = self.connect_array().reshape(-1)[indexes]
+
+            points = np.stack(np.unravel_index(indexes, self.shape), axis=1)
+            self.lines[self.lines_built:self.connection_count, 0] = points
+            self.lines[self.lines_built:self.connection_count, 1] = points + np.array(DIRECTIONS)[connect_vector]
+            self.lines_built = self.connection_count
+
+        return self.lines[:self.connection_count]
+
+    # generate runs update_grid as fast as it can until every cell is connected, or until max_iterations have run.
+    # It returns the number of iterations along with the seconds they took. Giving a seed restarts the random numbers
+    def generate(self, seed=None, max_iterations=None) -> tuple:
+        if seed is not None:
+            self.seed_random(seed)
+
+        iterations = 0
+        start = time.perf_counter()
+        while not self.finished and (max_iterations is None or iterations < max_iterations):
+            iterations += 1
+            if self.update_grid():
+                self.finished = True
+
+        return (iterations, time.perf_counter() - start)
+
+    # update_grid will go through an entire interation on the grid, reporting it to the observer if there is one
     def update_grid(self) -> bool:
+        self.started = True
+        if self.observer is None:
+            all_connected = self.iterate()
+        else:
+            all_connected = self.observed_iterate()
+
+        # a grid grown from several seeds is a forest until its trees are joined
+        if all_connected and len(self.roots) > 1:
+            self.merge_forest()
+        return all_connected
+
+    # place_seeds returns the flat indexes of the cells the maze starts growing from: (0,0,0), and count - 1 other
+    # cells drawn at random. Each one grows a tree of its own, until merge_forest joins them
+    def place_seeds(self, count) -> list:
+        cell_count = self.shape[0] * self.shape[1] * self.shape[2]
+        if not 1 <= count <= cell_count:
+            raise ValueError(f"a grid of {cell_count} cells can't start from {count} seeds")
+        if count == 1:
+            return [0]
+        return [0] + sorted(self.rng.sample(range(1, cell_count), count - 1))
+
+    # merge_forest joins the trees grown from each seed into one spanning tree rooted at (0,0,0). Pairs of neighboring
+    # cells in different trees are tried in a random order, and whenever one joins two separate parts, the part
+    # without (0,0,0) is re-rooted at its cell of the pair, which is then pointed at the other cell
+    def merge_forest(self) -> None:
+        offsets = direction_offsets(self.shape)
+        inside = inside_mask(self.shape).reshape(-1)
+        connect_vector = self.connect_array().reshape(-1).copy()
+
+        # the tree every cell is in, numbered by root, by following parent pointers until they all end at a root
+        parents = np.arange(len(connect_vector))
+        has_parent = connect_vector >= 0
+        parents[has_parent] += offsets[connect_vector[has_parent]]
+        while True:
+            grandparents = parents[parents]
+            if (grandparents == parents).all():
+                break
+            parents = grandparents
+        (roots, trees) = np.unique(parents, return_inverse=True)
+
+        # every pair of neighbors in different trees, once each, as the cell, its neighbor and the direction between
+        pairs = []
+        for direction in (1, 3, 5):
+            cells = np.flatnonzero(inside & (1 << direction))
+            cells = cells[trees[cells] != trees[cells + offsets[direction]]]
+            pairs.append(np.stack((cells, cells + offsets[direction], np.full(len(cells), direction))))
+        pairs = np.concatenate(pairs, axis=1).T
+        pairs = pairs[np.random.default_rng(self.rng.getrandbits(64)).permutation(len(pairs))].tolist()
+
+        # a union-find over the trees; the part holding (0,0,0) keeps its tree number as its representative
+        part = list(range(len(roots)))
+        def find(tree) -> int:
+            while part[tree] != tree:
+                part[tree] = part[part[tree]]
+                tree = part[tree]
+            return tree
+
+        joins = len(roots) - 1
+        for (index, neighbor, direction) in pairs:
+            if joins == 0:
+                break
+            (index_part, neighbor_part) = (find(trees[index]), find(trees[neighbor]))
+            if index_part == neighbor_part:
+                continue
+
+            # re-root whichever part doesn't hold (0,0,0), so the root of the joined part stays where it was
+            if neighbor_part == find(trees[0]):
+                reroot(connect_vector, offsets, index)
+                connect_vector[index] = direction
+                part[index_part] = neighbor_part
+            else:
+                reroot(connect_vector, offsets, neighbor)
+                connect_vector[neighbor] = (direction + 3) % 6
+                part[neighbor_part] = index_part
+            joins -= 1
+
+        self.write_connect_array(connect_vector)
+        self.roots = [0]
+        self.rebuild_connections()
+
+    # write_connect_array sets the connect vector of every cell from a flat array
+    def write_connect_array(self, connect_vector: np.ndarray) -> None:
+        for (cell, value) in zip(self.cells, connect_vector.tolist()):
+            cell.connect_vector = value
+
+    # write_states sets the state of the cells at the given flat indexes
+    def write_states(self, indexes, value) -> None:
+        for index in indexes:
+            self.cells[index].state = value
+
+    # observed_iterate runs one iteration and hands its TickStats to the observer. The states are compared before
+    # and after, so the engines themselves don't do any extra work for it
+    def observed_iterate(self) -> bool:
+        before = self.state_array().copy()
+        seed_present = self.seed_present
+
+        start = time.perf_counter()
+        all_connected = self.iterate()
+        seconds = time.perf_counter() - start
+
+        after = self.state_array()
+        transitions = np.bincount((before.reshape(-1) * 4 + after.reshape(-1)).astype(np.intp), minlength=16)
+        self.observer(self, TickStats(np.bincount(after.reshape(-1), minlength=4), transitions.reshape(4, 4),
+                                      seed_present, seconds, all_connected))
+        return all_connected
+
+    # iterate runs the rules over every cell once
+    def iterate(self) -> bool:
 
         # determine whether there will be a seed at the end of the iteration
         seen_seed = False
         all_connected = True
+        branch_prob = self.rules.branch_prob
 
         # iterate through each Cell in the grid
-        for i in range(len(self.grid)):
-            for j in range(len(self.grid[i])):
-                for k in range(len(self.grid[i][j])):
-                    cell = self.grid[i][j][k]
-
-                    # determine the state of the cell, and then do an action depending on what the cell is
-                    match cell.state:
-                        case 0:
-                            # look for an invitation from inviting cell
-                            # check the four squares around this one to see if they have the right vector DIRECTION IS AN INDEX
-                            for direction in range(6):
-                                # we've seen a disconnected cell, so it must be that not all cells are connected
-                                all_connected = False
+        for index in range(len(self.cells)):
+            cell = self.cells[index]
 
-                                # for each direction, find the neighboring cell coordinate in that direction
-                                (i_change, j_change, k_change) = DIRECTIONS[direction]
-                                i_n = i_change + i
-                                j_n = j_change + j
-                                k_n = k_change + k
-
-                                # if the value isn't in the grid, check the next direction
-                                if not self.in_grid(i_n,j_n,k_n):
-                                    continue
-                                
-                                # otherwise, create a reference to that neighboring cell
-                                cell_n = self.grid[i_n][j_n][k_n]
-
-                                # if the neighboring cell is not sending an invitation to this cell
-                                if not self.is_inviting(cell_n, direction):
-                                    continue
-
-                                # at this point, we've confirmed that the cell in the current direction is an inviting cell
-                                cell.connect_vector = direction
-                                cell.state = 1
-                                seen_seed = True
-                                break
-
-                        case 1:
-                            # scan the neighboring cells and create a map of which ones are disconnected and eligible
-                            cell = self.determine_neighbors(i, j, k, cell)
-
-                            # now that the bitarray is determined, we can choose a random valid neighbor and begin the operation
-                            # check that the seed has valid branch neighbors
-                            if cell.neighbors.count(1) == 0:
-                                # let the seed die
-                                cell.state = 3
-                            else:
-                                # pick a random valid candidate and assign that direction to the invite vector
-                                cell.invite_vector = self.valid_candidate_direction(cell)
-                                cell.state = 2
-                                all_connected = False
-                                
-                        case 2:
-                            # invite cell either becomes connected, or it becomes a seed as well
-                            if random.randint(1,100) <= BRANCH_PROB:
-                                cell.state = 1
-                                seen_seed = True
-                                all_connected = False
-                            else:
-                                cell.state = 3
+            # determine the state of the cell, and then do an action depending on what the cell is
+            match cell.state:
+                case 0:
+                    # we've seen a disconnected cell, so it must be that not all cells are connected
+                    all_connected = False
+
+                    # look for an invitation from inviting cell
+                    # check the six cells around this one to see if they have the right vector DIRECTION IS AN INDEX
+                    for direction in MASK_DIRECTIONS[self.inside[index]]:
+                        # if the neighboring cell is not sending an invitation to this cell
+                        if not self.is_inviting(self.cells[index + self.offsets[direction]], direction):
+                            continue
+
+                        # at this point, we've confirmed that the cell in the current direction is an inviting cell
+                        cell.connect_vector = direction
+                        cell.state = 1
+                        seen_seed = True
+                        self.record_connection(index)
+                        break
+
+                case 1:
+                    # scan the neighboring cells and create a map of which ones are disconnected and eligible
+                    cell = self.determine_neighbors(index, cell)
 
-                        case 3:
-                            # if there not a live seed in the grid, we have to check more
-                            if not self.seed_present:
+                    # now that the mask is determined, we can choose a random valid neighbor and begin the operation
+                    # check that the seed has valid branch neighbors
+                    if cell.neighbors == 0:
+                        # let the seed die
+                        cell.state = 3
+                    else:
+                        # pick a random valid candidate and assign that direction to the invite vector
+                        cell.invite_vector = self.valid_candidate_direction(cell)
+                        cell.state = 2
+                        all_connected = False
 
-                                # check that there is a disconnected cell in the neighborhood
-                                cell = self.determine_neighbors(i, j, k, cell)
-                                if cell.neighbors.count(1) > 0:
+                case 2:
+                    # invite cell either becomes connected, or it becomes a seed as well
+                    if self.rng.randint(1,100) <= branch_prob:
+                        cell.state = 1
+                        seen_seed = True
+                        all_connected = False
+                    else:
+                        cell.state = 3
 
-                                    # since there is a valid cell, then conditionally become a seed
-                                    if random.randint(1,100) <= BRANCH_PROB:
-                                        cell.state = 1
-                                        seen_seed = True
-                                        all_connected = False
+                case 3:
+                    # if there not a live seed in the grid, we have to check more
+                    if not self.seed_present:
 
-                        case _:
-                            print("This is not supposed to happen!")
+                        # check that there is a disconnected cell in the neighborhood
+                        cell = self.determine_neighbors(index, cell)
+                        if cell.neighbors != 0:
 
-                    # any clean up after the operation is done?
+                            # since there is a valid cell, then conditionally become a seed
+                            if self.rng.randint(1,100) <= branch_prob:
+                                cell.state = 1
+                                seen_seed = True
+                                all_connected = False
+
+                case _:
+                    print("This is not supposed to happen!")
 
         # After the loops have run, we update whether there's a seed in the grid
         self.seed_present = seen_seed
@@ -152,7 +540,8 @@ class CellGrid:
 
     # in_grid determines whether, given a coordinate, if that coordinate is valid in the grid.
     def in_grid(self, zpos, ypos, xpos) -> bool:
-        if zpos < 0 or zpos >= self.dim or ypos < 0 or ypos >= self.dim or xpos < 0 or xpos >= self.dim :
+        (depth, height, width) = self.shape
+        if zpos < 0 or zpos >= depth or ypos < 0 or ypos >= height or xpos < 0 or xpos >= width :
             return False
         return True
     
@@ -168,47 +557,568 @@ class CellGrid:
         
         return False
 
-    # returns the number 0-3 representing a direction of a vector
+    # returns the number 0-5 representing a direction of a vector
     def valid_candidate_direction(self, cell: Cell) -> int:
-        # determine an initial direction for the candidate neighbor
-        # if we go with a random 
-        if random.randint(1,100) <= TURN_PROB and cell.connect_vector >= 0:
-            direction = (cell.connect_vector + 3) % 6   # go straight
-        else:
-            direction = random.randint(0,5)             # go random direction
+        return self.choose_direction(cell.neighbors, cell.connect_vector)
 
-        # continue generating new directions if the current one isn't valid
-        while cell.neighbors & int2ba(2**direction, 6) == bitarray('000000'):
-            direction = random.randint(0,5)
+    # choose_direction picks a direction whose bit is set in mask, going straight on from the parent with the rules'
+    # turn_prob and otherwise choosing among the set bits, uniformly unless the rules weight the directions
+    def choose_direction(self, mask, connect_vector) -> int:
+        rules = self.rules
+        if self.rng.randint(1,100) <= rules.turn_prob and connect_vector >= 0:
+            direction = (connect_vector + 3) % 6   # go straight
+            if mask & (1 << direction):
+                return direction
 
-        return direction
+        # go random direction
+        if rules.uniform:
+            return self.rng.choice(MASK_DIRECTIONS[mask])
+        return rules.choose(mask, self.rng.random())
 
     # determine neighbors returns a modified Cell object that has its neighborhood updated
-    def determine_neighbors(self, i, j, k, cell: Cell) -> Cell:
+    def determine_neighbors(self, index, cell: Cell) -> Cell:
+
+        # initialize the neighbors mask
+        cell.neighbors = 0
+
+        for direction in MASK_DIRECTIONS[self.inside[index]]:
+            # if the neighboring cell is disconnected, we add it to the mask
+            if self.cells[index + self.offsets[direction]].state == 0:
+                cell.neighbors |= 1 << direction
+
+        return cell
 
-        # initialize the neighbors bitarray
-        cell.neighbors = bitarray('000000')
 
+# CellView stands in for a Cell of an ArrayCellGrid, reading and writing straight through to the grid's arrays
+class CellView:
+
+    __slots__ = ("_grid", "_index")
+
+    def __init__(self, grid, index) -> None:
+        self._grid = grid
+        self._index = index
+
+    @property
+    def state(self) -> int:
+        return int(self._grid.state[self._index])
+
+    @state.setter
+    def state(self, value) -> None:
+        self._grid.state[self._index] = value
+
+    @property
+    def connect_vector(self) -> int:
+        return int(self._grid.connect_vector[self._index])
+
+    @connect_vector.setter
+    def connect_vector(self, value) -> None:
+        self._grid.connect_vector[self._index] = value
+
+    @property
+    def invite_vector(self) -> int:
+        return int(self._grid.invite_vector[self._index])
+
+    @invite_vector.setter
+    def invite_vector(self, value) -> None:
+        self._grid.invite_vector[self._index] = value
+
+    # the neighbors are stored as a 6 bit integer mask, bit n being set when direction n is eligible
+    @property
+    def neighbors(self) -> int:
+        return int(self._grid.neighbors[self._index])
+
+    def __str__(self) -> str:
+        return f"({self.state}, {self.connect_vector}, {self.invite_vector}, {self.neighbors:06b})"
+
+# GridView lets an ArrayCellGrid be indexed like the nested lists of a CellGrid, so grid[i][j][k] gives a CellView
+class GridView:
+
+    __slots__ = ("_grid", "_prefix")
+
+    def __init__(self, grid, prefix=()) -> None:
+        self._grid = grid
+        self._prefix = prefix
+
+    def __len__(self) -> int:
+        return self._grid.shape[len(self._prefix)]
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("grid index out of range")
+
+        # once all three coordinates are known, hand back a view of the single cell
+        prefix = self._prefix + (index,)
+        if len(prefix) == 3:
+            return CellView(self._grid, prefix)
+        return GridView(self._grid, prefix)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+# ArrayCellGrid is a CellGrid that keeps every cell attribute in one contiguous array instead of a Cell object per cell
+class ArrayCellGrid(CellGrid):
+
+    def __init__(self, dim, engine="scalar", seed=None, fast_reseed=False, rules=None, seeds=1) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+        if fast_reseed and engine != "frontier":
+            raise ValueError("fast_reseed needs the frontier engine, the only one that keeps the boundary cells")
+        if engine == "jit":
+            # importing numba is slow, so jit.py is only imported once a grid asks for the jit engine
+            import jit
+            if not jit.available:
+                warnings.warn("numba is not installed, so the jit engine falls back to the scalar engine",
+                              RuntimeWarning)
+                engine = "scalar"
+        self.engine = engine
+
+        # with no live cell left, pick the reseeding cells straight from the boundary, see sample_reseeds
+        self.fast_reseed = fast_reseed
+        self.shape = grid_shape(dim)
+        self.dim = max(self.shape)
+
+        # one byte per cell for each attribute, using the same values as the Cell class
+        self.state = np.zeros(self.shape, dtype=np.int8)
+        self.connect_vector = np.full(self.shape, -1, dtype=np.int8)
+        self.invite_vector = np.full(self.shape, -1, dtype=np.int8)
+        self.neighbors = np.zeros(self.shape, dtype=np.uint8)
+
+        # the directions in which each cell has a neighbor, one byte per cell, and the flat index step to it
+        self.inside = inside_mask(self.shape)
+        self.offsets = direction_offsets(self.shape).tolist()
+
+        # bookkeeping for the frontier engine, built on its first iteration
+        self.live = None
+
+        self.setup(seed, rules, seeds)
+
+    # seed_random restarts both of the grid's random number generators from seed: the scalar engines draw from
+    # rng, the vectorized engine draws in bulk from np_rng
+    def seed_random(self, seed) -> None:
+        super().seed_random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+    # the arrays are already there, so these hand them out as they are
+    def state_array(self) -> np.ndarray:
+        return self.state
+
+    def connect_array(self) -> np.ndarray:
+        return self.connect_vector
+
+    def write_connect_array(self, connect_vector: np.ndarray) -> None:
+        self.connect_vector.reshape(-1)[...] = connect_vector
+
+    def write_states(self, indexes, value) -> None:
+        self.state.reshape(-1)[indexes] = value
+
+    # grid gives the same grid[i][j][k] access that game.py uses on a CellGrid
+    @property
+    def grid(self) -> GridView:
+        return GridView(self)
+
+    # iterate runs one iteration with the engine chosen for this grid
+    def iterate(self) -> bool:
+        if self.engine == "frontier":
+            return self.update_grid_frontier()
+
+        # the other engines don't keep the frontier up to date, so it has to be rebuilt if it is used again
+        self.live = None
+        if self.engine == "vectorized":
+            return self.update_grid_vectorized()
+        if self.engine == "jit":
+            return self.update_grid_jit()
+        return self.update_grid_scalar()
+
+    # update_grid_scalar runs the same rules as CellGrid.iterate, working on the arrays directly
+    def update_grid_scalar(self) -> bool:
+
+        # determine whether there will be a seed at the end of the iteration
+        seen_seed = False
+        all_connected = True
+        branch_prob = self.rules.branch_prob
+
+        state = self.state.reshape(-1)
+        connect_vector = self.connect_vector.reshape(-1)
+        invite_vector = self.invite_vector.reshape(-1)
+        inside = self.inside.reshape(-1)
+        offsets = self.offsets
+
+        for index in range(len(state)):
+
+            match state[index]:
+                case 0:
+                    # we've seen a disconnected cell, so it must be that not all cells are connected
+                    all_connected = False
+
+                    # look for a neighbor in state 2 whose invite vector points back at this cell
+                    for direction in MASK_DIRECTIONS[inside[index]]:
+                        neighbor = index + offsets[direction]
+                        if state[neighbor] != 2 or (invite_vector[neighbor] + 3) % 6 != direction:
+                            continue
+
+                        connect_vector[index] = direction
+                        state[index] = 1
+                        seen_seed = True
+                        self.record_connection(index)
+                        break
+
+                case 1:
+                    # a seed with no disconnected neighbors dies, otherwise it invites one of them
+                    mask = self.flat_neighbor_mask(index)
+                    if mask == 0:
+                        state[index] = 3
+                    else:
+                        invite_vector[index] = self.choose_direction(mask, connect_vector[index])
+                        state[index] = 2
+                        all_connected = False
+
+                case 2:
+                    # invite cell either becomes connected, or it becomes a seed as well
+                    if self.rng.randint(1,100) <= branch_prob:
+                        state[index] = 1
+                        seen_seed = True
+                        all_connected = False
+                    else:
+                        state[index] = 3
+
+                case 3:
+                    # with no live seed, connected cells next to a disconnected cell may become seeds
+                    if not self.seed_present:
+                        if self.flat_neighbor_mask(index) != 0:
+                            if self.rng.randint(1,100) <= branch_prob:
+                                state[index] = 1
+                                seen_seed = True
+                                all_connected = False
+
+                case _:
+                    print("This is not supposed to happen!")
+
+        # After the loop has run, we update whether there's a seed in the grid
+        self.seed_present = seen_seed
+
+        # Then, return whether the entire grid is connected or not
+        return all_connected
+
+    # update_grid_jit runs the scalar engine's sweep compiled by numba, see jit.sweep. It draws its random numbers
+    # from a generator of its own, seeded from rng on every iteration, so its mazes differ from the scalar engine's
+    def update_grid_jit(self) -> bool:
+        import jit
+        rules = self.rules
+        (all_connected, self.seed_present, self.connection_count) = jit.sweep(
+            self.state.reshape(-1), self.connect_vector.reshape(-1), self.invite_vector.reshape(-1),
+            self.neighbors.reshape(-1), self.inside.reshape(-1), direction_offsets(self.shape), self.connections,
+            self.connection_count, self.seed_present, rules.branch_prob, rules.turn_prob, rules.cumulative,
+            rules.uniform, MASK_BIT_COUNT, MASK_NTH_DIRECTION, self.rng.getrandbits(32))
+        return all_connected
+
+    # update_grid_vectorized applies the transitions to whole arrays of cells at once rather than visiting the cells
+    # one after another, in a few waves that keep to what the scalar sweep would see
+    def update_grid_vectorized(self) -> bool:
+        state = self.state
+        connect_vector = self.connect_vector
+        invite_vector = self.invite_vector
+        rng = self.np_rng
+        branch_prob = self.rules.branch_prob
+
+        disconnected = state == 0
+        seeds = state == 1
+        inviters = state == 2
+        connected = state == 3
+
+        # The scalar sweep visits cells in index order, so each cell sees the neighbors before it (north, up and west)
+        # as they are after their own visit, and the neighbors after it as they were. The iteration is settled in
+        # waves to match: an open cell takes its invitation, if any, once no seed behind it is left to choose, and a
+        # seed chooses once the open cells behind it are settled, so it draws from the mask the sweep would give it.
+        # The waves only touch seeds, inviters and their neighbors, so they work on flat indexes
+        open_cells = disconnected.reshape(-1).copy()
+        unsettled = np.zeros(open_cells.shape, dtype=bool)
+        pending = np.flatnonzero(seeds)
+        inviters_now = np.flatnonzero(inviters)
+        accepted = [np.zeros(0, dtype=np.intp)]
+        inviting = [np.zeros(0, dtype=np.intp)]
+        while True:
+            # open cells that a seed still to choose could invite: those just after one in the sweep
+            waiting = self.flat_neighbors(pending, (1, 3, 5))
+            waiting = waiting[open_cells[waiting]]
+            unsettled[waiting] = True
+
+            # 0 -> 1: only invitations from inviters of the last iteration and ones made east, south or down in this
+            # one reach a cell before the sweep moves its inviter on
+            newly_accepted = self.accept_invitations(inviters_now, open_cells & ~unsettled)
+            open_cells[newly_accepted] = False
+            accepted.append(newly_accepted)
+            if len(pending) == 0:
+                break
+
+            # 1 -> 2 for the seeds that can choose now, inviting a neighbor that is still open when they are visited
+            blocked = np.zeros(len(pending), dtype=bool)
+            for direction in (0, 2, 4):
+                (cells, neighbors) = self.flat_step(pending, direction)
+                blocked[cells] |= unsettled[neighbors]
+            unsettled[waiting] = False
+            ready = pending[~blocked]
+            pending = pending[blocked]
+
+            masks = self.flat_open_mask(ready, open_cells, disconnected.reshape(-1))
+            choosing = ready[masks != 0]
+            directions = self.choose_directions(masks[masks != 0], connect_vector.reshape(-1)[choosing])
+            invite_vector.reshape(-1)[choosing] = directions
+            inviters_now = np.concatenate((inviters_now, choosing[directions % 2 == 1]))
+            inviting.append(choosing)
+
+        accepted = np.sort(np.concatenate(accepted))
+        inviting = np.concatenate(inviting)
+        self.record_connections(accepted)
+
+        # mask of disconnected neighbors for every cell, as its visit in the sweep sees them; 1 -> 3 for the seeds
+        # with nowhere to go
+        mask = self.open_mask(open_cells.reshape(self.shape), disconnected)
+        self.neighbors = mask
+        dying = seeds.copy()
+        dying.reshape(-1)[inviting] = False
+
+        # 2 -> 1 with branch_prob, otherwise 2 -> 3
+        branching = np.zeros(self.shape, dtype=bool)
+        branching[inviters] = rng.integers(1, 101, size=np.count_nonzero(inviters)) <= branch_prob
+
+        # 3 -> 1 with branch_prob next to a disconnected cell, only while there is no live seed
+        reseeding = np.zeros(self.shape, dtype=bool)
+        if not self.seed_present:
+            candidates = connected & (mask != 0)
+            reseeding[candidates] = rng.integers(1, 101, size=np.count_nonzero(candidates)) <= branch_prob
+
+        state.reshape(-1)[accepted] = 1
+        state[branching | reseeding] = 1
+        state.reshape(-1)[inviting] = 2
+        state[dying | (inviters & ~branching)] = 3
+
+        # After the transitions are applied, we update whether there's a seed in the grid
+        self.seed_present = bool(len(accepted) or branching.any() or reseeding.any())
+
+        # Then, return whether the entire grid is connected or not
+        return bool((state == 3).all())
+
+    # flat_step returns the positions among the flat indexes cells of those that have a neighbor in direction, and
+    # the flat indexes of those neighbors
+    def flat_step(self, cells, direction) -> tuple:
+        positions = np.flatnonzero(self.inside.reshape(-1)[cells] & (1 << direction))
+        return (positions, cells[positions] + self.offsets[direction])
+
+    # flat_neighbors returns the flat indexes of the neighbors of cells in any of the directions, repeats included
+    def flat_neighbors(self, cells, directions) -> np.ndarray:
+        return np.concatenate([self.flat_step(cells, direction)[1] for direction in directions])
+
+    # flat_open_mask returns the mask of disconnected neighbors of each of the flat indexes cells, taking the
+    # neighbors before it in the sweep from open_cells and the neighbors after it from disconnected
+    def flat_open_mask(self, cells, open_cells, disconnected) -> np.ndarray:
+        masks = np.zeros(len(cells), dtype=np.uint8)
+        for direction in range(6):
+            (positions, neighbors) = self.flat_step(cells, direction)
+            source = open_cells if direction % 2 == 0 else disconnected
+            masks[positions] |= source[neighbors].astype(np.uint8) << direction
+        return masks
+
+    # open_mask is flat_open_mask for every cell of the grid at once
+    def open_mask(self, open_cells, disconnected) -> np.ndarray:
+        mask = np.zeros(self.shape, dtype=np.uint8)
         for direction in range(6):
-            # for each direction, find the neighboring cell coordinate in that direction
-            (i_change, j_change, k_change) = DIRECTIONS[direction]
-            i_n = i_change + i
-            j_n = j_change + j
-            k_n = k_change + k
-
-            # if the value isn't in the grid, check the next direction
-            if not self.in_grid(i_n,j_n,k_n):
+            before = direction % 2 == 0
+            mask |= self.shifted(open_cells if before else disconnected, direction, False).view(np.uint8) << direction
+        return mask
+
+    # accept_invitations connects each cell that an inviter points at and that targets allows to the first such
+    # inviter in direction order. inviters are flat indexes, and so are the connected cells it returns
+    def accept_invitations(self, inviters, targets) -> np.ndarray:
+        invites = self.invite_vector.reshape(-1)[inviters]
+        invited = inviters + direction_offsets(self.shape)[invites]
+        allowed = targets[invited]
+        (invited, directions) = (invited[allowed], (invites[allowed] + 3) % 6)
+
+        order = np.lexsort((directions, invited))
+        (invited, directions) = (invited[order], directions[order])
+        first = np.ones(len(invited), dtype=bool)
+        first[1:] = invited[1:] != invited[:-1]
+        self.connect_vector.reshape(-1)[invited[first]] = directions[first]
+        return invited[first]
+
+    # choose_directions picks an invite direction for each mask, going straight with the rules' turn_prob and
+    # otherwise among the set bits, uniformly unless the rules weight the directions
+    def choose_directions(self, masks, connect_vectors) -> np.ndarray:
+        rng = self.np_rng
+        rules = self.rules
+        count = len(masks)
+
+        # a pick among the set bits of each mask: where a uniform number falls among the bits, or among their weights
+        if rules.uniform:
+            nth = (rng.random(count) * MASK_BIT_COUNT[masks]).astype(np.intp)
+        else:
+            nth = (rng.random(count)[:, np.newaxis] >= rules.cumulative[masks]).sum(axis=1)
+        directions = MASK_NTH_DIRECTION[masks, nth]
+
+        # override with the straight direction where the roll succeeds and that direction is open
+        straight = (connect_vectors + 3) % 6
+        go_straight = (rng.integers(1, 101, size=count) <= rules.turn_prob) & (connect_vectors >= 0)
+        go_straight &= (masks >> np.where(connect_vectors >= 0, straight, 0).astype(np.uint8)) & 1 == 1
+        directions[go_straight] = straight[go_straight]
+
+        return directions
+
+    # shifted returns an array holding at each cell the value of its neighbor in the given direction,
+    # or fill where that neighbor is off the grid
+    def shifted(self, array, direction, fill) -> np.ndarray:
+        result = np.full_like(array, fill)
+        destination = []
+        source = []
+        for change, length in zip(DIRECTIONS[direction], self.shape):
+            destination.append(slice(max(-change, 0), length - max(change, 0)))
+            source.append(slice(max(change, 0), length - max(-change, 0)))
+        result[tuple(destination)] = array[tuple(source)]
+        return result
+
+    # update_grid_frontier runs the same sweep as update_grid_scalar, in the same order, but only visits the cells
+    # that can change: seeds, inviters, the cells they invite and, with no live seed, connected cells on the boundary
+    def update_grid_frontier(self) -> bool:
+        if self.live is None:
+            self.rebuild_frontier()
+
+        state = self.state.reshape(-1)
+        connect_vector = self.connect_vector.reshape(-1)
+        invite_vector = self.invite_vector.reshape(-1)
+
+        if not self.seed_present:
+            # connected cells never regain a disconnected neighbor, so ones that lost theirs are dropped for good
+            self.boundary = {index for index in self.boundary
+                             if state[index] == 3 and self.flat_neighbor_mask(index) != 0}
+
+            # with nothing live, an iteration can do nothing but reseed boundary cells
+            if self.fast_reseed and not self.live and self.boundary:
+                reseeds = self.sample_reseeds(sorted(self.boundary))
+                state[reseeds] = 1
+                self.live = set(reseeds)
+                self.seed_present = True
+                return False
+
+        # gather every cell that may change during this iteration
+        active = set(self.live)
+        for index in self.live:
+            if state[index] == 2:
+                invitee = index + self.offsets[invite_vector[index]]
+                if state[invitee] == 0:
+                    active.add(invitee)
+        if not self.seed_present:
+            active |= self.boundary
+
+        seen_seed = False
+        all_connected = self.disconnected_count == 0
+        live = set()
+        branch_prob = self.rules.branch_prob
+        inside = self.inside.reshape(-1)
+        offsets = self.offsets
+
+        # visit the cells in index order; a sorted list is already a heap, and invitees further along are pushed on
+        heap = sorted(active)
+        last_index = -1
+        while heap:
+            index = heapq.heappop(heap)
+            if index == last_index:
                 continue
+            last_index = index
 
-            # otherwise, create a reference to that neighboring cell
-            cell_n = self.grid[i_n][j_n][k_n]
+            match state[index]:
+                case 0:
+                    for direction in MASK_DIRECTIONS[inside[index]]:
+                        neighbor = index + offsets[direction]
+                        if state[neighbor] != 2 or (invite_vector[neighbor] + 3) % 6 != direction:
+                            continue
 
-            # if the neighboring cell is disconnected, we add it to the bitarray
-            if cell_n.state == 0:
-                b =  int2ba(2**direction, 6)
-                cell.neighbors = cell.neighbors | b
+                        connect_vector[index] = direction
+                        state[index] = 1
+                        seen_seed = True
+                        self.record_connection(index)
+                        live.add(index)
+                        self.disconnected_count -= 1
+                        break
 
-        return cell
+                case 1:
+                    mask = self.flat_neighbor_mask(index)
+                    if mask == 0:
+                        state[index] = 3
+                    else:
+                        direction = self.choose_direction(mask, connect_vector[index])
+                        invite_vector[index] = direction
+                        state[index] = 2
+                        all_connected = False
+                        live.add(index)
 
+                        # an invitee later in the sweep gets its chance to accept during this iteration
+                        invitee = index + offsets[direction]
+                        if invitee > index:
+                            heapq.heappush(heap, invitee)
 
-        
+                case 2:
+                    if self.rng.randint(1,100) <= branch_prob:
+                        state[index] = 1
+                        seen_seed = True
+                        all_connected = False
+                        live.add(index)
+                    else:
+                        state[index] = 3
+                        self.boundary.add(index)
+
+                case 3:
+                    if self.flat_neighbor_mask(index) != 0:
+                        if self.rng.randint(1,100) <= branch_prob:
+                            state[index] = 1
+                            seen_seed = True
+                            all_connected = False
+                            live.add(index)
+
+        self.live = live
+        self.seed_present = seen_seed
+        return all_connected
+
+    # sample_reseeds picks the boundary cells that become seeds in one reseeding iteration. Every cell reseeds with
+    # branch_prob on its own, just as in the sweep, but iterations in which none of them would are skipped: the first
+    # reseeding cell is drawn given that there is one, and the gaps to the next ones are geometric. The work is one
+    # draw per new seed rather than one per boundary cell
+    def sample_reseeds(self, boundary: list) -> list:
+        miss = 1 - self.rules.branch_prob / 100
+        if miss <= 0:
+            return boundary
+        if miss >= 1:
+            return []
+
+        # the position of the first success among len(boundary) tries, knowing there is at least one
+        position = int(math.log(1 - self.rng.random() * (1 - miss ** len(boundary))) / math.log(miss))
+        position = min(position, len(boundary) - 1)
+        reseeds = []
+        while position < len(boundary):
+            reseeds.append(boundary[position])
+            position += 1 + int(math.log(1 - self.rng.random()) / math.log(miss))
+        return reseeds
+
+    # rebuild_frontier works out the frontier engine's bookkeeping from the arrays
+    def rebuild_frontier(self) -> None:
+        has_disconnected_neighbor = np.zeros(self.shape, dtype=bool)
+        for direction in range(6):
+            has_disconnected_neighbor |= self.shifted(self.state == 0, direction, False)
+
+        # live cells are seeds and inviters, boundary cells are connected cells next to a disconnected one
+        self.live = set(np.flatnonzero((self.state == 1) | (self.state == 2)).tolist())
+        self.boundary = set(np.flatnonzero((self.state == 3) & has_disconnected_neighbor).tolist())
+        self.disconnected_count = int(np.count_nonzero(self.state == 0))
+
+    # flat_neighbor_mask stores and returns the mask of disconnected cells around a flat index
+    def flat_neighbor_mask(self, index) -> int:
+        state = self.state.reshape(-1)
+        mask = 0
+        for direction in MASK_DIRECTIONS[self.inside.reshape(-1)[index]]:
+            if state[index + self.offsets[direction]] == 0:
+                mask |= 1 << direction
+
+        self.neighbors.reshape(-1)[index] = mask
+        return mask
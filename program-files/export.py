@@ -0,0 +1,163 @@
+import argparse
+import cell
+import numpy as np
+import os
+import struct
+import zlib
+
+try:
+    from PIL import GifImagePlugin, Image
+except ImportError:     # Pillow is only needed for GIFs; PNG frames are written with zlib alone
+    Image = None
+
+# Frames are arrays of palette indexes, one byte per pixel. A cell's state is its own index, so a frame is made by
+# indexing into the state array rather than drawing each cell, and index 4 is the background
+PALETTE = np.array([
+    (255, 255, 255),    # 0 disconnected, white as in game.py
+    (0, 255, 0),        # 1 seed, green
+    (0, 0, 255),        # 2 invite, blue
+    (255, 150, 0),      # 3 connected, orange
+    (0, 0, 0),          # background, black
+], dtype=np.uint8)
+BACKGROUND = 4
+
+VIEWS = ("slice", "isometric")
+
+# slice_frame shows one layer of the grid across an axis, each cell as a scale x scale square
+def slice_frame(state: np.ndarray, axis=0, index=0, scale=4) -> np.ndarray:
+    layer = np.take(state, index, axis=axis).astype(np.uint8)
+    return np.repeat(np.repeat(layer, scale, axis=0), scale, axis=1)
+
+# IsometricView draws the grid from above one corner, every cell that isn't disconnected being a small square and the
+# nearer cells covering the further ones. Which pixels each cell covers, and which cell is nearest where squares
+# overlap, depend only on the shape, so they are worked out once and every frame is a handful of array operations
+class IsometricView:
+
+    def __init__(self, shape, scale=2) -> None:
+        (depth, height, width) = shape
+        (i, j, k) = (axis.reshape(-1) for axis in np.indices(shape))
+        self.frame_shape = ((height + width) * scale // 2 + depth * scale + scale,
+                            (height + width) * scale)
+
+        # the flat frame index of every pixel of each cell's square, a row per flat cell index
+        (dy, dx) = (offset.reshape(-1) for offset in np.indices((scale, scale)))
+        x = (k - j + height - 1) * scale
+        y = (k + j) * scale // 2 + i * scale
+        pixels = ((y[:, np.newaxis] + dy) * self.frame_shape[1] + x[:, np.newaxis] + dx).reshape(-1)
+        cells = np.repeat(np.arange(len(i)), scale * scale)
+
+        # every (pixel, cell) pair, grouped by pixel with the nearest cell first: the one higher up, or further
+        # forward along the rows and columns, and after that the one with the later flat index
+        nearness = np.repeat(j + k - i, scale * scale)
+        order = np.lexsort((-cells, -nearness, pixels))
+        self.pixels = pixels[order].astype(np.int32)
+        self.cells = cells[order].astype(np.int32)
+
+    def frame(self, state: np.ndarray) -> np.ndarray:
+        frame = np.full(self.frame_shape, BACKGROUND, dtype=np.uint8)
+        states = state.reshape(-1)[self.cells]
+        shown = states != 0
+        (pixels, states) = (self.pixels[shown], states[shown])
+
+        # each pixel shows the first shown cell of its group, the nearest
+        first = np.ones(len(pixels), dtype=bool)
+        first[1:] = pixels[1:] != pixels[:-1]
+        frame.reshape(-1)[pixels[first]] = states[first]
+        return frame
+
+# png_bytes encodes a frame of palette indexes as an 8 bit palette PNG
+def png_bytes(frame: np.ndarray, palette=PALETTE) -> bytes:
+    def chunk(kind, data) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    (height, width) = frame.shape
+    rows = np.zeros((height, width + 1), dtype=np.uint8)    # each row starts with filter type 0
+    rows[:, 1:] = frame
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+            + chunk(b"PLTE", palette.tobytes())
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+# frames runs the grid to completion and yields a frame before the first iteration, after every every-th iteration
+# and after the last one
+def frames(cellgrid: cell.CellGrid, render, every=1):
+    yield render(cellgrid.state_array())
+
+    iterations = 0
+    while not cellgrid.finished:
+        iterations += 1
+        if cellgrid.update_grid():
+            cellgrid.finished = True
+        if iterations % every == 0 or cellgrid.finished:
+            yield render(cellgrid.state_array())
+
+# GifWriter writes an endlessly looping animated GIF one frame at a time, so no more than one frame is ever held.
+# Pillow encodes the header and each frame, the writer only strings them together
+class GifWriter:
+
+    def __init__(self, path, frame_ms=40) -> None:
+        if Image is None:
+            raise ImportError("writing a GIF needs Pillow; PNG frames can be written without it")
+        self.file = open(path, "wb")
+        self.frame_ms = frame_ms
+        self.started = False
+
+    def add(self, frame: np.ndarray) -> None:
+        image = Image.frombytes("P", (frame.shape[1], frame.shape[0]), frame.tobytes())
+        image.putpalette(PALETTE.tobytes())
+        if not self.started:
+            (header, _) = GifImagePlugin.getheader(image, info={"loop": 0, "duration": self.frame_ms})
+            self.file.write(b"".join(header))
+            self.started = True
+        self.file.write(b"".join(GifImagePlugin.getdata(image, duration=self.frame_ms)))
+
+    # close ends the GIF with its trailer byte
+    def close(self) -> None:
+        self.file.write(b";")
+        self.file.close()
+
+# export streams the frames of a grid's generation to a folder of numbered PNG files, and to an animated GIF when
+# gif is given. It returns the number of frames
+def export(cellgrid: cell.CellGrid, folder, view="slice", every=1, scale=4, axis=0, index=0, gif=None,
+           frame_ms=40) -> int:
+    gif_writer = GifWriter(gif, frame_ms) if gif is not None else None
+
+    if view == "slice":
+        render = lambda state: slice_frame(state, axis, index, scale)
+    else:
+        render = IsometricView(cellgrid.shape, scale).frame
+
+    os.makedirs(folder, exist_ok=True)
+    count = 0
+    try:
+        for (count, frame) in enumerate(frames(cellgrid, render, every), 1):
+            with open(os.path.join(folder, f"frame_{count - 1:05d}.png"), "wb") as file:
+                file.write(png_bytes(frame))
+            if gif_writer is not None:
+                gif_writer.add(frame)
+    finally:
+        if gif_writer is not None:
+            gif_writer.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the generation of a maze out as image frames.")
+    parser.add_argument("folder", help="folder to write the PNG frames to")
+    parser.add_argument("--dim", type=int, default=32, help="side of a cubic maze")
+    parser.add_argument("--shape", type=int, nargs=3, metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                        help="build the maze with this shape instead of a cube")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=cell.ENGINES, default="frontier")
+    parser.add_argument("--view", choices=VIEWS, default="slice")
+    parser.add_argument("--axis", type=int, choices=(0, 1, 2), default=0, help="axis a slice is taken across")
+    parser.add_argument("--index", type=int, default=0, help="layer a slice is taken at")
+    parser.add_argument("--scale", type=int, default=4, help="pixels on each side of a cell")
+    parser.add_argument("--every", type=int, default=1, help="write a frame every this many iterations")
+    parser.add_argument("--gif", help="also write an animated GIF here (needs Pillow)")
+    args = parser.parse_args()
+
+    cellgrid = cell.ArrayCellGrid(tuple(args.shape) if args.shape else args.dim, engine=args.engine, seed=args.seed)
+    count = export(cellgrid, args.folder, args.view, args.every, args.scale, args.axis, args.index, args.gif)
+    print(f"{count} frames written to {args.folder}")
@@ -1,464 +1,506 @@
 import pygame
+import background
 import cell
 import numpy as np
 import math
-from bitarray import bitarray
-from bitarray.util import int2ba
 
 PROJECTION_MATRIX = np.array([[1,0,0],[0,1,0],[0,0,0]])
 WINDOW_WIDTH = 1400
 WINDOW_HEIGHT = 800
 DIMENSION = 5             ## DIMENSION DEFINED HERE : 5-10 recommended for gameplay. Anything higher is entertaining to build but not to play ##
-IS_EVEN = DIMENSION % 2 == 0
+                          ## a (depth, height, width) tuple makes a box instead of a cube, a depth of 1 a flat maze                       ##
 CELL_SIZE = 50
 
-def draw_grid_numbers(cellgrid, points_2d: list) -> None:
-
-    index = 0
-    for i in range(cellgrid.dim):
-        for j in range(cellgrid.dim):
-            for k in range(cellgrid.dim):
-                cellDigit = font.render(f"{cellgrid.grid[i][j][k].connect_vector}", False, black, colors[cellgrid.grid[i][j][k].state])
-                screen.blit(cellDigit, (points_2d[index][0]*600/cellgrid.dim+WINDOW_WIDTH/2, points_2d[index][1]*600/cellgrid.dim+WINDOW_HEIGHT/2))
-                index += 1   
-
-def draw_grid_skeletal(cellgrid, ang_x, ang_y, ang_z, full_grid: bool, player_position) -> None:
-
-    lines = get_2d_skeleton(cellgrid, ang_x, ang_y, ang_z)
-    if player_position == (DIMENSION-1, DIMENSION-1, DIMENSION-1):
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            (x2, y2) = point2;
-            pygame.draw.line(screen, green, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2),
-                            (x2*600/DIMENSION+WINDOW_WIDTH/2, y2*600/DIMENSION+WINDOW_HEIGHT/2), 2)
-
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            pygame.draw.circle(screen, green, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 3)
-        
-        # draw goal point
-        (goal_point, point2) = lines[-1]
-        (x1, y1) = goal_point
-        pygame.draw.circle(screen, yellow, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 5)
-
-        # draw current point
-        (x1, y1) = get_specific_point_2dcoords(ang_x, ang_y, ang_z, player_position)
-        pygame.draw.circle(screen, red, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 5)
-        return True
-
-    elif full_grid:
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            (x2, y2) = point2;
-            pygame.draw.line(screen, grey, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2),
-                            (x2*600/DIMENSION+WINDOW_WIDTH/2, y2*600/DIMENSION+WINDOW_HEIGHT/2), 2)
-
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            pygame.draw.circle(screen, white, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 3)
-        
-        # draw goal point
-        (goal_point, point2) = lines[-1]
-        (x1, y1) = goal_point
-        pygame.draw.circle(screen, yellow, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 5)
-
-        # draw current point
-        (x1, y1) = get_specific_point_2dcoords(ang_x, ang_y, ang_z, player_position)
-        pygame.draw.circle(screen, red, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 5)
-
-
-    else:
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            (x2, y2) = point2;
-            pygame.draw.line(screen, blue, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2),
-                            (x2*600/DIMENSION+WINDOW_WIDTH/2, y2*600/DIMENSION+WINDOW_HEIGHT/2), 2)
-
-        for line in lines:
-            (point1, point2) = line
-            (x1, y1) = point1;
-            pygame.draw.circle(screen, black, (x1*600/DIMENSION+WINDOW_WIDTH/2, y1*600/DIMENSION+WINDOW_HEIGHT/2), 3)
-
-# returns a list of numpy 1x3 arrays for drawing the 3D number grid
-def generate_points_list(dim) -> list:
-    points = []
-    if dim%2 == 0: # if the dimension is even, don't floor the coordinate value
-        for x in range(dim):
-            for y in range(dim):
-                for z in range(dim):
-                    points.append(np.array([[x-((dim-1)/2)],[y-((dim-1)/2)],[z-((dim-1)/2)]]))
-    else: # if the dimension is odd, floor the coordinate value
-        for x in range(dim):
-            for y in range(dim):
-                for z in range(dim):
-                    points.append(np.array([[x-(dim//2)],[y-(dim//2)],[z-(dim//2)]]))
-    return points
-
-def get_2d_points(points, ang_x, ang_y, ang_z) -> list:
-
-    # first, define the rotation matrices depending on the angles provided
-    rotation_x = np.array([[1, 0, 0],[0, math.cos(ang_x), -math.sin(ang_x)],[0, math.sin(ang_x), math.cos(ang_x)]])
-    rotation_y = np.array([[math.cos(ang_y), 0, math.sin(ang_y)],[0, 1, 0],[-math.sin(ang_y), 0, math.cos(ang_y)]])
-    rotation_z = np.array([[math.cos(ang_z), -math.sin(ang_z), 0],[math.sin(ang_z), math.cos(ang_z), 0],[0, 0, 1]])
-
-    # define the new points list that will be returned
-    points_2d = []
-
-    # now, for every point in points, find the 2D point associated with it
-    for point in points:
-        new_point = PROJECTION_MATRIX @ rotation_z @ rotation_y @ rotation_x @ point
-        points_2d.append((new_point[0][0], new_point[1][0]))
+### culled rendering ###
+RENDER_MODES = ("full", "near", "slice")    # every line, the blocks around the player, or the player's layer of blocks
+BLOCK_SIZE = 4                              # side of the blocks of cells the lines are indexed by
+VIEW_RADIUS = 1                             # blocks drawn on each side of the player's block in "near" mode
+CULL_DIMENSION = 10                         # mazes larger than this start the game in "near" mode
 
-    return points_2d
-
-def generate_raw_line_list(cellgrid: cell.CellGrid) -> list:
-
-    raw_line_list = []
+### colors ###
+white = (255, 255, 255)
+yellow = (255, 255, 0)
+green = (0, 255, 0)
+blue = (0, 0, 255)
+orange = (255, 150, 0)
+black = (0, 0, 0)
+red = (255, 0 ,0)
+grey = (128, 128, 128)
+colors = (white, green, blue, orange)
 
-    for i in range(DIMENSION):
-        for j in range(DIMENSION):
-            for k in range(DIMENSION):
+def draw_grid_numbers(cellgrid, points_2d: np.ndarray) -> None:
 
-                point1 = (i,j,k)        # create the initial point location
-                direction = cellgrid.grid[i][j][k].connect_vector
+    # one label per cell, every label coming out of the glyph cache, all blitted in a single call
+    connect_vectors = cellgrid.connect_array().reshape(-1).tolist()
+    states = cellgrid.state_array().reshape(-1).tolist()
+    labels = [(get_glyph(connect_vector, state), point)
+              for (connect_vector, state, point) in zip(connect_vectors, states, points_2d.tolist())]
+    screen.blits(labels, doreturn=False)
 
-                if direction == -1:
-                    continue
-                else:
-                    point2 = tuple(map(lambda a, b: a+b, point1, cell.DIRECTIONS[direction]))
+# there are only 7 connect vectors and 4 states, so each label is rendered once and kept
+glyphs = {}
 
-                line = (point1, point2)
-                raw_line_list.append(line);
+def get_glyph(connect_vector, state) -> pygame.Surface:
+    if (connect_vector, state) not in glyphs:
+        glyphs[(connect_vector, state)] = font.render(f"{connect_vector}", False, black, colors[state])
+    return glyphs[(connect_vector, state)]
 
-    return raw_line_list
+def draw_grid_skeletal(cellgrid, ang_x, ang_y, ang_z, full_grid: bool, player_position, render_mode="full") -> bool:
 
-def get_2d_skeleton(cellgrid: cell.CellGrid, ang_x, ang_y, ang_z) -> list:
+    # pick the colors: background, lines and points
+    goal = tuple(length-1 for length in cellgrid.shape)
+    completed = player_position == goal
+    if completed:
+        scheme = (black, green, green)
+    elif full_grid:
+        scheme = (black, grey, white)
+    else:
+        scheme = (white, blue, black)
 
-    raw_list = generate_raw_line_list(cellgrid)
-    line_list = []
-    rotated_line_list = []
+    # the skeleton itself comes from a surface that is only drawn again when the maze or the view changes, and holds
+    # only the lines of the blocks in view when rendering is culled
+    blocks = None
+    if render_mode != "full":
+        blocks = visible_blocks(cellgrid.shape, player_position, render_mode)
+    screen.blit(skeleton_surface.get(cellgrid, ang_x, ang_y, ang_z, scheme, blocks), (0, 0))
 
-    rotation_x = np.array([[1, 0, 0],[0, math.cos(ang_x), -math.sin(ang_x)],[0, math.sin(ang_x), math.cos(ang_x)]])
-    rotation_y = np.array([[math.cos(ang_y), 0, math.sin(ang_y)],[0, 1, 0],[-math.sin(ang_y), 0, math.cos(ang_y)]])
-    rotation_z = np.array([[math.cos(ang_z), -math.sin(ang_z), 0],[math.sin(ang_z), math.cos(ang_z), 0],[0, 0, 1]])
+    if completed or full_grid:
+        # draw goal point
+        goal_point = get_specific_point_2dcoords(cellgrid.shape, ang_x, ang_y, ang_z, goal)
+        pygame.draw.circle(screen, yellow, goal_point, 5)
 
-    # convert the points from cellgrid indexes to drawable coordinates scaled with a radius around 0,0
-
-    if IS_EVEN:
-        for line in raw_list:
-            (point1, point2) = line
-            (x1,y1,z1) = point1
-            (x2,y2,z2) = point2
-            new_point1 = np.array([[x1-((DIMENSION-1)/2)],[y1-((DIMENSION-1)/2)],[z1-((DIMENSION-1)/2)]])
-            new_point2 = np.array([[x2-((DIMENSION-1)/2)],[y2-((DIMENSION-1)/2)],[z2-((DIMENSION-1)/2)]])
-            new_line = (new_point1, new_point2)
-            line_list.append(new_line)
-    else:
-        for line in raw_list:
-            (point1, point2) = line
-            (x1,y1,z1) = point1
-            (x2,y2,z2) = point2
-            new_point1 = np.array([[x1-(DIMENSION//2)],[y1-(DIMENSION//2)],[z1-(DIMENSION//2)]])
-            new_point2 = np.array([[x2-(DIMENSION//2)],[y2-(DIMENSION//2)],[z2-(DIMENSION//2)]])
-            new_line = (new_point1, new_point2)
-            line_list.append(new_line)
-
-    # convert the points from scaled coordinates to rotated and projected
-    for line in line_list:
-        (point1, point2) = line
-        new_point1 = PROJECTION_MATRIX @ rotation_z @ rotation_y @ rotation_x @ point1
-        new_point2 = PROJECTION_MATRIX @ rotation_z @ rotation_y @ rotation_x @ point2
-        new_line = ((new_point1[0][0], new_point1[1][0]),(new_point2[0][0], new_point2[1][0]))
-        rotated_line_list.append(new_line)
-
-    return rotated_line_list
-
-def get_specific_point_2dcoords(ang_x, ang_y, ang_z, player_position: list) -> list:
-    
-    # define rotation matrices
+        # draw current point
+        player_point = get_specific_point_2dcoords(cellgrid.shape, ang_x, ang_y, ang_z, player_position)
+        pygame.draw.circle(screen, red, player_point, 5)
+
+    return completed
+
+# draw_progress writes how far the generation has got in the top left corner of the window
+def draw_progress(view, generating: bool) -> None:
+    percent = 100 * view.connected_count / view.cell_count
+    text = f"iteration {view.iterations}: {view.connected_count}/{view.cell_count} cells connected ({percent:.0f}%)"
+    if generating:
+        text += ", generating..."
+    screen.blit(font.render(text, False, black, white), (10, 10))
+
+# SkeletonSurface keeps the maze skeleton pre-rendered onto a window-sized Surface for one view and color scheme.
+# Lines of newly connected cells are drawn on top of it as the maze grows; anything else starts a fresh surface.
+# Given blocks, it holds only the lines of those blocks, drawn again whenever the maze grows. Like SkeletonCache it
+# keeps the grid and compares it with is rather than by id
+class SkeletonSurface:
+
+    def __init__(self) -> None:
+        self.cellgrid = None
+        self.key = None
+        self.surface = None
+        self.lines_drawn = 0
+
+    def get(self, cellgrid, ang_x, ang_y, ang_z, scheme, blocks=None) -> pygame.Surface:
+        if blocks is None:
+            lines = get_2d_skeleton(cellgrid, ang_x, ang_y, ang_z)
+            key = (cellgrid.geometry_version, ang_x, ang_y, ang_z, scheme)
+        else:
+            lines = get_2d_block_skeleton(cellgrid, blocks, ang_x, ang_y, ang_z)
+            key = (cellgrid.geometry_version, cellgrid.connection_count, ang_x, ang_y, ang_z, scheme, blocks)
+        (background, line_color, point_color) = scheme
+
+        if cellgrid is not self.cellgrid or key != self.key or len(lines) < self.lines_drawn:
+            if self.surface is None:
+                self.surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+            self.surface.fill(background)
+            self.cellgrid = cellgrid
+            self.key = key
+            self.lines_drawn = 0
+
+        for (point1, point2) in lines[self.lines_drawn:].tolist():
+            pygame.draw.line(self.surface, line_color, point1, point2, 2)
+
+        for (point1, point2) in lines[self.lines_drawn:].tolist():
+            pygame.draw.circle(self.surface, point_color, point1, 3)
+
+        self.lines_drawn = len(lines)
+        return self.surface
+
+skeleton_surface = SkeletonSurface()
+
+# returns the matrix that rotates a point by the three angles and projects it onto the screen plane
+def view_matrix(ang_x, ang_y, ang_z) -> np.ndarray:
     rotation_x = np.array([[1, 0, 0],[0, math.cos(ang_x), -math.sin(ang_x)],[0, math.sin(ang_x), math.cos(ang_x)]])
     rotation_y = np.array([[math.cos(ang_y), 0, math.sin(ang_y)],[0, 1, 0],[-math.sin(ang_y), 0, math.cos(ang_y)]])
     rotation_z = np.array([[math.cos(ang_z), -math.sin(ang_z), 0],[math.sin(ang_z), math.cos(ang_z), 0],[0, 0, 1]])
-
-    # convert point to scaled radius
-    (x,y,z) = player_position
-    if IS_EVEN:
-        new_point = np.array([[x-((DIMENSION-1)/2)],[y-((DIMENSION-1)/2)],[z-((DIMENSION-1)/2)]])
+    return PROJECTION_MATRIX @ rotation_z @ rotation_y @ rotation_x
+
+# project takes an N x 3 array of grid coordinates and returns the N x 2 array of window coordinates to draw them at.
+# Centering the grid around 0,0, rotating, projecting, scaling by 600 over the longest side and moving to the middle
+# of the window are folded into one 3 x 2 matrix and one offset, so every point is done by a single matmul.
+# dim is the side of a cube or a (depth, height, width) shape
+def project(points: np.ndarray, dim, ang_x, ang_y, ang_z) -> np.ndarray:
+    shape = np.array(cell.grid_shape(dim))
+    center = (shape-1)/2    # the middle cell, or halfway between the two middle cells on an even side
+
+    transform = (view_matrix(ang_x, ang_y, ang_z)[:2] * 600/shape.max()).T
+    offset = np.array([WINDOW_WIDTH/2, WINDOW_HEIGHT/2]) - center @ transform
+    return points @ transform + offset
+
+# returns an N x 3 array of the grid coordinates of every cell, in the order draw_grid_numbers draws them
+def generate_points_list(dim) -> np.ndarray:
+    return np.indices(cell.grid_shape(dim)).reshape(3, -1).T
+
+def get_2d_points(points, dim, ang_x, ang_y, ang_z) -> np.ndarray:
+    return project(points, dim, ang_x, ang_y, ang_z)
+
+# returns an N x 2 x 3 array with the grid coordinates of both ends of every line between a cell and its parent.
+# The grid keeps these cached and only adds the lines of newly connected cells
+def generate_raw_line_list(cellgrid: cell.CellGrid) -> np.ndarray:
+    return cellgrid.line_endpoints()
+
+# SkeletonCache holds the projected lines of one grid. The lines are only projected again when the grid or the view
+# angles change; while the maze is growing, just the lines added since the last frame are projected and appended.
+# The grid itself is kept and compared with is, since a new grid can be given the id of one that was freed
+class SkeletonCache:
+
+    def __init__(self) -> None:
+        self.cellgrid = None
+        self.key = None
+        self.lines = np.empty((0, 2, 2))
+
+    def get(self, cellgrid: cell.CellGrid, ang_x, ang_y, ang_z) -> np.ndarray:
+        raw_list = generate_raw_line_list(cellgrid)
+        key = (cellgrid.geometry_version, ang_x, ang_y, ang_z)
+
+        if cellgrid is not self.cellgrid or key != self.key or len(raw_list) < len(self.lines):
+            self.lines = project(raw_list.reshape(-1, 3), cellgrid.shape, ang_x, ang_y, ang_z).reshape(-1, 2, 2)
+            self.cellgrid = cellgrid
+            self.key = key
+        elif len(raw_list) > len(self.lines):
+            new_lines = raw_list[len(self.lines):].reshape(-1, 3)
+            new_lines = project(new_lines, cellgrid.shape, ang_x, ang_y, ang_z).reshape(-1, 2, 2)
+            self.lines = np.concatenate((self.lines, new_lines))
+
+        return self.lines
+
+skeleton_cache = SkeletonCache()
+
+# returns an N x 2 x 2 array with the window coordinates of both ends of every line
+def get_2d_skeleton(cellgrid: cell.CellGrid, ang_x, ang_y, ang_z) -> np.ndarray:
+    return skeleton_cache.get(cellgrid, ang_x, ang_y, ang_z)
+
+# BlockIndex sorts the lines of one grid by the block of BLOCK_SIZE cells their child cell is in, so the lines of any
+# block can be sliced out without looking at the others. It is built again whenever the grid changes or the maze has
+# grown, and keeps the grid to compare with is rather than by id
+class BlockIndex:
+
+    def __init__(self) -> None:
+        self.cellgrid = None
+        self.key = None
+        self.lines = np.empty((0, 2, 3), dtype=np.int32)
+        self.starts = np.zeros(1, dtype=np.int64)
+
+    def get(self, cellgrid: cell.CellGrid) -> "BlockIndex":
+        key = (cellgrid.geometry_version, cellgrid.connection_count)
+        if cellgrid is not self.cellgrid or key != self.key:
+            lines = generate_raw_line_list(cellgrid)
+            block_counts = block_shape(cellgrid.shape)
+            block_ids = np.ravel_multi_index(tuple((lines[:, 0] // BLOCK_SIZE).T), block_counts)
+            order = np.argsort(block_ids, kind="stable")
+
+            self.lines = lines[order]
+            self.starts = np.searchsorted(block_ids[order], np.arange(math.prod(block_counts) + 1))
+            self.cellgrid = cellgrid
+            self.key = key
+        return self
+
+    # lines_in returns the grid coordinates of the lines of the given flat block ids
+    def lines_in(self, blocks) -> np.ndarray:
+        pieces = [self.lines[self.starts[block]:self.starts[block + 1]] for block in blocks]
+        return np.concatenate(pieces) if pieces else self.lines[:0]
+
+block_index = BlockIndex()
+
+# returns how many blocks there are along each axis of a grid of this shape
+def block_shape(shape) -> tuple:
+    return tuple(-(-length // BLOCK_SIZE) for length in shape)
+
+# returns the flat ids of the blocks to draw in a culled render mode, as a tuple so it can be part of a cache key:
+# in "near" mode the blocks up to VIEW_RADIUS away from the player's block, in "slice" mode the whole layer of blocks
+# the player is in
+def visible_blocks(shape, player_position, render_mode) -> tuple:
+    block_counts = block_shape(shape)
+    player_block = [position // BLOCK_SIZE for position in player_position]
+
+    if render_mode == "slice":
+        ranges = [range(player_block[0], player_block[0] + 1), range(block_counts[1]), range(block_counts[2])]
     else:
-        new_point = np.array([[x-(DIMENSION//2)],[y-(DIMENSION//2)],[z-(DIMENSION//2)]])
-        
-    # rotate and project the point
-    rotated_point = PROJECTION_MATRIX @ rotation_z @ rotation_y @ rotation_x @ new_point
-    new_player_position = (rotated_point[0][0],rotated_point[1][0])
-
-    return new_player_position
-
-def move_player(cellgrid, player_position: list, direction: list, legal_moves: list) -> list:
-    new_position = tuple(map(lambda a, b: a+b, player_position, direction))
-    for index in new_position:
-        if index < 0 or index >= DIMENSION:
-            return player_position
-    if is_legal_move(player_position, new_position, legal_moves):
-        return new_position
-    return player_position
-    
-def is_legal_move(player_position: list, new_position: list, legal_moves: list) -> bool:
-    # for all legal moves at this space
-    (x,y,z) = player_position
-    for points in legal_moves[x][y][z]:
-        if points == new_position:
-            return True
-    return False
-
-def generate_legal_moves(cellgrid: cell.CellGrid) -> list:
-    moves_list = [[[[] for i in range(DIMENSION)] for j in range(DIMENSION)] for k in range(DIMENSION)]
-    for i in range(DIMENSION):
-        for j in range(DIMENSION):
-            for k in range(DIMENSION):
-                if i == 0 and j == 0 and k == 0:
-                    continue
-
-                current_position = (i,j,k)
-                current_cell = cellgrid.grid[i][j][k]
-                
-                new_position = tuple(map(lambda a, b: a+b, current_position, cell.DIRECTIONS[current_cell.connect_vector]))
-                
-                # add the (x,y,z) of the connect vector position to this (i,j,k) list in moves list
-                moves_list[i][j][k].append(new_position)
-
-                # add the current position to the (x,y,z) list in moves list
-                (x,y,z) = new_position
-                moves_list[x][y][z].append(current_position)
-    
-    return moves_list
+        ranges = [range(max(block - VIEW_RADIUS, 0), min(block + VIEW_RADIUS + 1, count))
+                  for (block, count) in zip(player_block, block_counts)]
 
+    blocks = np.stack(np.meshgrid(*ranges, indexing="ij")).reshape(3, -1)
+    return tuple(np.ravel_multi_index(tuple(blocks), block_counts).tolist())
 
-#####################################################################################################################
-
+# returns an N x 2 x 2 array with the window coordinates of both ends of the lines in the given blocks, projecting
+# only those lines
+def get_2d_block_skeleton(cellgrid: cell.CellGrid, blocks: tuple, ang_x, ang_y, ang_z) -> np.ndarray:
+    lines = block_index.get(cellgrid).lines_in(blocks)
+    return project(lines.reshape(-1, 3), cellgrid.shape, ang_x, ang_y, ang_z).reshape(-1, 2, 2)
 
-### pygame setup ###
-pygame.init()
-
-screen = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT))  # creates a Surface
-clock = pygame.time.Clock()                                     # Creates a clock to track FPS
-running = True                                                  # When the game is running
-dt = 0                                                          # delta time since last frame
-cellgrid = cell.CellGrid(DIMENSION)
-font = pygame.font.SysFont('arial', 20, True, False)
-clicking = False
-dragging = False
-points = generate_points_list(cellgrid.dim)
-theta_x = 0
-theta_y = 0
-theta_z = 0
-plotting_points = get_2d_points(points, theta_x, theta_y, theta_z)
-game1 = True                                                    # Enter game 1 upon start
-game2 = False
-grid_finished = False
-player_pos = (0,0,0)                                            # player index in the cellgrid grid
-legal_moves = [[[[]]]]
-maze_complete = False
+def get_specific_point_2dcoords(shape, ang_x, ang_y, ang_z, player_position: list) -> tuple:
+    return tuple(project(np.array([player_position]), shape, ang_x, ang_y, ang_z)[0])
 
-### colors ###
-white = (255, 255, 255)
-yellow = (255, 255, 0)
-green = (0, 255, 0)
-blue = (0, 0, 255)
-orange = (255, 150, 0)
-black = (0, 0, 0)
-red = (255, 0 ,0)
-grey = (128, 128, 128)
-colors = (white, green, blue, orange)
+def move_player(cellgrid, player_position: list, direction: list, legal_moves: np.ndarray) -> list:
+    if is_legal_move(cellgrid, player_position, direction, legal_moves):
+        return tuple(map(lambda a, b: a+b, player_position, direction))
+    return player_position
+    
+def is_legal_move(cellgrid, player_position: list, direction: list, legal_moves: np.ndarray) -> bool:
+    # a move is legal when the passage in that direction is open; open passages never lead off the grid
+    index = np.ravel_multi_index(player_position, cellgrid.shape)
+    return bool(legal_moves[index] & (1 << cell.DIRECTIONS.index(direction)))
 
-### initial screen fill ###
-screen.fill("white")
-draw_grid_numbers(cellgrid, plotting_points)
-pygame.display.flip()
- 
-#######################################################################################################################
+# returns the open passage mask of every cell, one byte per cell in flat index order
+def generate_legal_moves(cellgrid: cell.CellGrid) -> np.ndarray:
+    return cellgrid.passage_array().reshape(-1)
 
-### GAME LOOP ###
 
-while running:
-    if game1:
-        # get the relative movement of the mouse
-        (movement_x, movement_y) = pygame.mouse.get_rel()
+#####################################################################################################################
 
-        # get a list of 2D plottable points from the list 
-        plotting_points = get_2d_points(points, theta_x, theta_y, theta_z)
 
-        # poll for events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+if __name__ == "__main__":
+
+    ### pygame setup ###
+    pygame.init()
+
+    screen = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT))  # creates a Surface
+    clock = pygame.time.Clock()                                     # Creates a clock to track FPS
+    running = True                                                  # When the game is running
+    dt = 0                                                          # delta time since last frame
+    cellgrid = cell.ArrayCellGrid(DIMENSION, engine="frontier")
+    generator = background.BackgroundGenerator(cellgrid)         # runs update_grid off the render loop
+    view = generator.snapshot                                       # the grid as last published by the generator
+    font = pygame.font.SysFont('arial', 20, True, False)
+    clicking = False
+    dragging = False
+    points = generate_points_list(cellgrid.shape)
+    theta_x = 0
+    theta_y = 0
+    theta_z = 0
+    plotting_points = get_2d_points(points, cellgrid.shape, theta_x, theta_y, theta_z)
+    game1 = True                                                    # Enter game 1 upon start
+    game2 = False
+    grid_finished = False
+    player_pos = (0,0,0)                                            # player index in the cellgrid grid
+    legal_moves = None
+    maze_complete = False
+    last_frame = None                                               # what was on the screen when it was last drawn
+    render_mode = "near" if cellgrid.dim > CULL_DIMENSION else "full"  # see RENDER_MODES
+
+    ### initial screen fill ###
+    screen.fill("white")
+    draw_grid_numbers(view, plotting_points)
+    draw_progress(view, False)
+    pygame.display.flip()
+
+    #######################################################################################################################
+
+    ### GAME LOOP ###
+
+    while running:
+        if game1:
+            # get the relative movement of the mouse
+            (movement_x, movement_y) = pygame.mouse.get_rel()
+
+            # poll for events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    clicking = True
+                if event.type == pygame.MOUSEBUTTONUP:
+                    clicking = False
+                if event.type == pygame.WINDOWEXPOSED:
+                    last_frame = None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_g:
+                    generator.run_until_done()
+
+            # edit the angle of the cube based on the mouse movements
+            if clicking:
+                theta_x += movement_y * -0.1 * dt
+                theta_y += movement_x * 0.1 * dt
+
+            # the generator publishes its iterations in the background; pick up whether it is done
+            with generator.lock:
+                grid_finished = view.finished
+
+            # key presses
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_ESCAPE]:
                 running = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                clicking = True
-            if event.type == pygame.MOUSEBUTTONUP:
-                clicking = False
-        
-        # edit the angle of the cube based on the mouse movements
-        if clicking:
-            theta_x += movement_y * -0.1 * dt
-            theta_y += movement_x * 0.1 * dt
-
-        # draw one iteration
-        screen.fill("white")
-        draw_grid_numbers(cellgrid, plotting_points)
-
-        # key presses
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_ESCAPE]:
-            running = False
-        if keys[pygame.K_SPACE]:
-            if cellgrid.update_grid():
-                grid_finished = True
-        if keys[pygame.K_PAGEUP]:
-            if grid_finished:   
-                game1 = False           # continue onto game 3
-                game2 = False
-                pygame.event.clear()    # empty the event queue
-                legal_moves = generate_legal_moves(cellgrid)
-            else:
-                game1 = False           # continue onto game 2
-                game2 = True
+            if keys[pygame.K_SPACE]:
+                generator.step()
+            if keys[pygame.K_PAGEUP]:
+                if grid_finished:   
+                    game1 = False           # continue onto game 3
+                    game2 = False
+                    pygame.event.clear()    # empty the event queue
+                    legal_moves = generate_legal_moves(view)
+                else:
+                    game1 = False           # continue onto game 2
+                    game2 = True
+                    pygame.event.clear()    # empty the event queue
+                    pygame.time.wait(50)
+            if keys[pygame.K_RIGHT]:
+                theta_y += dt
+            if keys[pygame.K_LEFT]:
+                theta_y -= dt
+            if keys[pygame.K_UP]:
+                theta_x += dt
+            if keys[pygame.K_DOWN]:
+                theta_x -= dt
+
+            # draw one iteration and print it onto the screen, only if something on it has changed
+            frame = (1, theta_x, theta_y, theta_z, view.iterations, generator.busy)
+            if game1 and frame != last_frame:
+                screen.fill("white")
+                plotting_points = get_2d_points(points, cellgrid.shape, theta_x, theta_y, theta_z)
+                with generator.lock:
+                    draw_grid_numbers(view, plotting_points)
+                    draw_progress(view, generator.busy)
+                pygame.display.flip()
+                last_frame = frame
+            dt = clock.tick(60) / 1000
+
+        # end of game 1
+        elif game2:
+
+            # get the relative movement of the mouse
+            (movement_x, movement_y) = pygame.mouse.get_rel()
+
+            # poll for events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    clicking = True
+                if event.type == pygame.MOUSEBUTTONUP:
+                    clicking = False
+                if event.type == pygame.WINDOWEXPOSED:
+                    last_frame = None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_g:
+                    generator.run_until_done()
+
+            # edit the angle of the cube based on the mouse movements
+            if clicking:
+                theta_x += movement_y * -0.1 * dt
+                theta_y += movement_x * 0.1 * dt
+
+            # key presses
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_ESCAPE]:
+                running = False
+            if keys[pygame.K_PAGEDOWN]:
+                game1 = True
                 pygame.event.clear()    # empty the event queue
                 pygame.time.wait(50)
-        if keys[pygame.K_RIGHT]:
-            theta_y += dt
-        if keys[pygame.K_LEFT]:
-            theta_y -= dt
-        if keys[pygame.K_UP]:
-            theta_x += dt
-        if keys[pygame.K_DOWN]:
-            theta_x -= dt
-        
-        # print all the changes to the Surface onto the screen
-        pygame.display.flip()
-        dt = clock.tick(60) / 1000
-
-    # end of game 1
-    elif game2:
-
-        # get the relative movement of the mouse
-        (movement_x, movement_y) = pygame.mouse.get_rel()
-
-        # poll for events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+            if keys[pygame.K_SPACE]:
+                generator.step()
+
+            # once the generator has connected every cell, go on to game 3
+            with generator.lock:
+                if view.finished and game2:
+                    grid_finished = True
+                    game2 = False
+                    pygame.event.clear()    # empty the event queue
+                    legal_moves = generate_legal_moves(view)
+            if keys[pygame.K_RIGHT]:
+                theta_y += dt
+            if keys[pygame.K_LEFT]:
+                theta_y -= dt
+            if keys[pygame.K_UP]:
+                theta_x += dt
+            if keys[pygame.K_DOWN]:
+                theta_x -= dt
+
+            # draw one iteration and print it onto the screen, only if something on it has changed
+            frame = (2, theta_x, theta_y, theta_z, view.iterations, generator.busy)
+            if game2 and frame != last_frame:
+                with generator.lock:
+                    draw_grid_skeletal(view, theta_x, theta_y, theta_z, grid_finished, player_pos)
+                    draw_progress(view, generator.busy)
+                pygame.display.flip()
+                last_frame = frame
+
+            # limits FPS to 60
+            # dt is delta time in seconds since last frame, used for framerate-
+            # independent physics.
+            dt = clock.tick(60) / 1000
+
+        # end of gameloop 2
+        else:
+            # get the relative movement of the mouse
+            (movement_x, movement_y) = pygame.mouse.get_rel()
+
+            # poll for events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    clicking = True
+                if event.type == pygame.MOUSEBUTTONUP:
+                    clicking = False
+                if event.type == pygame.WINDOWEXPOSED:
+                    last_frame = None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_w and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.NORTH, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_s and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.SOUTH, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_a and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.WEST, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_d and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.EAST, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_q and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.UP, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_e and not maze_complete:
+                    player_pos = move_player(view, player_pos, cell.DOWN, legal_moves)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+                    render_mode = RENDER_MODES[(RENDER_MODES.index(render_mode) + 1) % len(RENDER_MODES)]
+
+            # edit the angle of the cube based on the mouse movements
+            if clicking:
+                theta_x += movement_y * -0.1 * dt
+                theta_y += movement_x * 0.1 * dt
+
+            # key presses
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_ESCAPE]:
                 running = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                clicking = True
-            if event.type == pygame.MOUSEBUTTONUP:
-                clicking = False
-        
-        # edit the angle of the cube based on the mouse movements
-        if clicking:
-            theta_x += movement_y * -0.1 * dt
-            theta_y += movement_x * 0.1 * dt
-
-        # draw one iteration
-        screen.fill("white")
-        draw_grid_skeletal(cellgrid, theta_x, theta_y, theta_z, grid_finished, player_pos)
-
-        # key presses
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_ESCAPE]:
-            running = False
-        if keys[pygame.K_PAGEDOWN]:
-            game1 = True
-            pygame.event.clear()    # empty the event queue
-            pygame.time.wait(50)
-        if keys[pygame.K_SPACE]:
-            if cellgrid.update_grid():
-                grid_finished = True
-                game2 = False
+            if keys[pygame.K_PAGEDOWN]:
+                game1 = True
                 pygame.event.clear()    # empty the event queue
-                legal_moves = generate_legal_moves(cellgrid)
-        if keys[pygame.K_RIGHT]:
-            theta_y += dt
-        if keys[pygame.K_LEFT]:
-            theta_y -= dt
-        if keys[pygame.K_UP]:
-            theta_x += dt
-        if keys[pygame.K_DOWN]:
-            theta_x -= dt
-        
-        # print all the changes to the Surface onto the screen
-        pygame.display.flip()
-
-        # limits FPS to 60
-        # dt is delta time in seconds since last frame, used for framerate-
-        # independent physics.
-        dt = clock.tick(60) / 1000
-
-    # end of gameloop 2
-    else:
-        # get the relative movement of the mouse
-        (movement_x, movement_y) = pygame.mouse.get_rel()
-
-        # poll for events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                clicking = True
-            if event.type == pygame.MOUSEBUTTONUP:
-                clicking = False
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_w and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.NORTH, legal_moves)
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_s and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.SOUTH, legal_moves)
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_a and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.WEST, legal_moves)
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_d and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.EAST, legal_moves)
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_q and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.UP, legal_moves)
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_e and not maze_complete:
-                player_pos = move_player(cellgrid, player_pos, cell.DOWN, legal_moves)
-        
-        # edit the angle of the cube based on the mouse movements
-        if clicking:
-            theta_x += movement_y * -0.1 * dt
-            theta_y += movement_x * 0.1 * dt
-
-        # draw one iteration
-        screen.fill("black")
-        if draw_grid_skeletal(cellgrid, theta_x, theta_y, theta_z, grid_finished, player_pos):
-            maze_complete = True
-
-        # key presses
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_ESCAPE]:
-            running = False
-        if keys[pygame.K_PAGEDOWN]:
-            game1 = True
-            pygame.event.clear()    # empty the event queue
-            pygame.time.wait(50)
-        if keys[pygame.K_RIGHT]:
-            theta_y += dt
-        if keys[pygame.K_LEFT]:
-            theta_y -= dt
-        if keys[pygame.K_UP]:
-            theta_x += dt
-        if keys[pygame.K_DOWN]:
-            theta_x -= dt
-
-        # print all the changes to the Surface onto the screen
-        pygame.display.flip()
-
-        # limits FPS to 60
-        # dt is delta time in seconds since last frame, used for framerate-
-        # independent physics.
-        dt = clock.tick(60) / 1000
-
-
-
-# end of running
-
-pygame.quit()
+                pygame.time.wait(50)
+            if keys[pygame.K_RIGHT]:
+                theta_y += dt
+            if keys[pygame.K_LEFT]:
+                theta_y -= dt
+            if keys[pygame.K_UP]:
+                theta_x += dt
+            if keys[pygame.K_DOWN]:
+                theta_x -= dt
+
+            # draw one iteration and print it onto the screen, only if something on it has changed
+            frame = (3, theta_x, theta_y, theta_z, player_pos, render_mode)
+            if not game1 and frame != last_frame:
+                if draw_grid_skeletal(view, theta_x, theta_y, theta_z, grid_finished, player_pos, render_mode):
+                    maze_complete = True
+                pygame.display.flip()
+                last_frame = frame
+
+            # limits FPS to 60
+            # dt is delta time in seconds since last frame, used for framerate-
+            # independent physics.
+            dt = clock.tick(60) / 1000
+
+
+
+    # end of running
+
+    generator.stop()
+    pygame.quit()
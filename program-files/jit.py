@@ -0,0 +1,98 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:     # numba is optional; without it the "jit" engine falls back to the scalar engine
+    numba = None
+
+# whether the "jit" engine can run here
+available = numba is not None
+
+# sweep runs one iteration of the automaton over flat arrays, with the same rules and in the same order as
+# ArrayCellGrid.update_grid_scalar, and is compiled by numba when it is installed. Newly connected cells are logged
+# in connections from connection_count on. The random numbers come from numpy's generator seeded with seed on every
+# call, so a grid's maze depends only on the seeds it hands out. It returns whether every cell is connected, whether
+# a seed was seen and the new connection_count
+def sweep(state, connect_vector, invite_vector, neighbors, inside, offsets, connections, connection_count,
+          seed_present, branch_prob, turn_prob, cumulative, uniform, mask_bit_count, mask_nth_direction, seed):
+    np.random.seed(seed)
+    seen_seed = False
+    all_connected = True
+
+    for index in range(state.shape[0]):
+        cell_state = state[index]
+
+        if cell_state == 0:
+            all_connected = False
+
+            # accept the invitation of the first neighbor, in direction order, whose invite vector points back here
+            for direction in range(6):
+                if not inside[index] & (1 << direction):
+                    continue
+                neighbor = index + offsets[direction]
+                if state[neighbor] != 2 or (invite_vector[neighbor] + 3) % 6 != direction:
+                    continue
+
+                connect_vector[index] = direction
+                state[index] = 1
+                seen_seed = True
+                connections[connection_count] = index
+                connection_count += 1
+                break
+
+        elif cell_state == 1:
+            mask = neighbor_mask(state, inside, offsets, neighbors, index)
+            if mask == 0:
+                state[index] = 3
+            else:
+                # go straight on from the parent with turn_prob, otherwise pick among the open directions
+                direction = -1
+                parent = connect_vector[index]
+                if np.random.randint(1, 101) <= turn_prob and parent >= 0:
+                    straight = (parent + 3) % 6
+                    if mask & (1 << straight):
+                        direction = straight
+                if direction < 0:
+                    uniform_number = np.random.random()
+                    if uniform:
+                        nth = int(uniform_number * mask_bit_count[mask])
+                    else:
+                        nth = 0
+                        while uniform_number >= cumulative[mask, nth]:
+                            nth += 1
+                    direction = mask_nth_direction[mask, nth]
+
+                invite_vector[index] = direction
+                state[index] = 2
+                all_connected = False
+
+        elif cell_state == 2:
+            if np.random.randint(1, 101) <= branch_prob:
+                state[index] = 1
+                seen_seed = True
+                all_connected = False
+            else:
+                state[index] = 3
+
+        elif not seed_present:
+            # with no live seed, connected cells next to a disconnected cell may become seeds
+            if neighbor_mask(state, inside, offsets, neighbors, index) != 0:
+                if np.random.randint(1, 101) <= branch_prob:
+                    state[index] = 1
+                    seen_seed = True
+                    all_connected = False
+
+    return (all_connected, seen_seed, connection_count)
+
+# neighbor_mask stores and returns the mask of disconnected cells around a flat index
+def neighbor_mask(state, inside, offsets, neighbors, index):
+    mask = 0
+    for direction in range(6):
+        if inside[index] & (1 << direction) and state[index + offsets[direction]] == 0:
+            mask |= 1 << direction
+    neighbors[index] = mask
+    return mask
+
+if available:
+    neighbor_mask = numba.njit(cache=True)(neighbor_mask)
+    sweep = numba.njit(cache=True)(sweep)
@@ -0,0 +1,96 @@
+import analysis
+import argparse
+import cell
+import mazefile
+import random
+import tiled
+
+# The command line way into the maze generator, without pygame: run from this folder as
+#
+#   python -m maze generate --dim 64 --seed 7 --out maze.bin
+#   python -m maze load maze.bin
+#   python -m maze stats maze.bin
+
+# generate grows one maze and writes it to a maze file. With --tile it is grown chunk by chunk, see tiled.py. Without
+# --seed a seed is drawn here, so the file always records the seed it can be grown again from
+def generate(args) -> None:
+    shape = cell.grid_shape(args.shape if args.shape else args.dim)
+    rules = cell.Rules(args.branch_prob, args.turn_prob, args.axis_weights, args.goal_bias)
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 63)
+
+    if args.tile:
+        print(tiled.generate_tiled(shape, args.tile, args.out, args.seed, args.engine, rules))
+        return
+
+    cellgrid = cell.ArrayCellGrid(shape, engine=args.engine, seed=args.seed, fast_reseed=args.fast_reseed,
+                                  rules=rules, seeds=args.seeds)
+    (iterations, seconds) = cellgrid.generate()
+    mazefile.save(cellgrid, args.out)
+    print(f"{'x'.join(str(length) for length in shape)} maze: {iterations} iterations in {seconds:.3f}s, "
+          f"written to {args.out}")
+
+# load reads a maze file and prints what its header says about it
+def load(args) -> None:
+    maze = mazefile.load(args.path)
+    flags = [name for (name, value) in (("fast reseed", maze.fast_reseed), ("tiled", maze.tiled),
+                                        ("weighted directions", maze.weighted), ("several seeds", maze.seeds))
+             if value]
+    print("\n".join((
+        f"shape:             {'x'.join(str(length) for length in maze.shape)} ({maze.cell_count} cells)",
+        f"seed:              {maze.seed if maze.seed is not None else 'unknown'}",
+        f"generator version: {maze.generator_version}",
+        f"engine:            {maze.engine or 'unknown'}{''.join(f', {flag}' for flag in flags)}",
+        f"branch prob:       {maze.branch_prob}%",
+        f"turn prob:         {maze.turn_prob}%",
+    )))
+
+# stats reads a maze file and prints its MazeStats
+def stats(args) -> None:
+    connect_vector = mazefile.load(args.path).connect_array()
+    print(analysis.analyze(connect_vector, tuple(args.start), tuple(args.goal) if args.goal else None))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="maze", description="Generate, load and analyze mazes without a window.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("generate", help="generate a maze and save it")
+    command.add_argument("--dim", type=int, default=10, help="side of a cubic maze")
+    command.add_argument("--shape", type=int, nargs=3, metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                         help="build the maze with this shape instead of a cube")
+    command.add_argument("--seed", type=int, default=None)
+    command.add_argument("--engine", choices=cell.ENGINES, default="frontier")
+    command.add_argument("--fast-reseed", action="store_true", help="sample reseeds from the boundary (frontier only)")
+    command.add_argument("--branch-prob", type=int, default=cell.BRANCH_PROB,
+                         help="percent chance an inviting cell branches into a new seed, 1 to 100")
+    command.add_argument("--turn-prob", type=int, default=cell.TURN_PROB,
+                         help="percent chance an invitation goes straight on")
+    command.add_argument("--axis-weights", type=float, nargs=3, default=(1, 1, 1), metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                         help="how much each axis is preferred when an invitation turns")
+    command.add_argument("--goal-bias", type=float, default=1, help="extra weight of the directions towards the goal")
+    command.add_argument("--seeds", type=int, default=1, help="number of seeds the maze starts growing from")
+    command.add_argument("--tile", type=int, nargs=3, metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                         help="grow the maze in chunks of this shape, for mazes too large for memory")
+    command.add_argument("--out", required=True, help="maze file to write")
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser("load", help="print the header of a maze file")
+    command.add_argument("path")
+    command.set_defaults(run=load)
+
+    command = commands.add_parser("stats", help="print the statistics of a maze file")
+    command.add_argument("path")
+    command.add_argument("--start", type=int, nargs=3, default=(0, 0, 0), metavar=("I", "J", "K"))
+    command.add_argument("--goal", type=int, nargs=3, metavar=("I", "J", "K"),
+                         help="end of the solution path (default: the far corner)")
+    command.set_defaults(run=stats)
+
+    args = parser.parse_args()
+
+    # tiled.py grows every chunk from a single seed with the plain reseeding
+    if args.command == "generate" and args.tile:
+        for (flag, given) in (("--seeds", args.seeds != 1), ("--fast-reseed", args.fast_reseed)):
+            if given:
+                parser.error(f"{flag} can't be used with --tile")
+    args.run(args)
@@ -0,0 +1,173 @@
+import cell
+import numpy as np
+import struct
+
+# A maze file is a 32 byte header followed by the connect vector of every cell in flat index order, each stored as
+# connect_vector + 1 (0 for the root, 1-6 for a direction) in 3 bits. Every 8 cells fill exactly 3 bytes, and the
+# last group of 8 is padded out with zeros.
+#
+# header: magic, format version, generator version, depth, height, width, seed, branch_prob, turn_prob,
+#         engine (index into cell.ENGINES, 255 when unknown), flags
+#
+# The axis weights and goal bias of the rules don't fit the header; FLAG_WEIGHTED only records that there were some.
+# Likewise FLAG_SEEDS records that the maze grew from more than one seed, but not how many
+MAGIC = b"CAMZ"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHIIIqBBBB")
+HEADER_SIZE = HEADER.size
+
+FLAG_HAS_SEED = 1
+FLAG_FAST_RESEED = 2
+FLAG_TILED = 4
+FLAG_WEIGHTED = 8
+FLAG_SEEDS = 16
+NO_ENGINE = 255
+
+# cells packed per pass when saving, so the temporary arrays stay small for huge mazes
+PACK_BLOCK = 8 * 65536
+
+# pack_directions packs an array of connect vectors into 3 bits each, 8 cells to every 3 bytes
+def pack_directions(connect_vector: np.ndarray) -> np.ndarray:
+    values = np.zeros(-(-len(connect_vector) // 8) * 8, dtype=np.uint32)
+    values[:len(connect_vector)] = connect_vector + 1
+    values = values.reshape(-1, 8)
+
+    # the 8 values of a group make one 24 bit number, the first value in the highest bits
+    combined = np.zeros(len(values), dtype=np.uint32)
+    for position in range(8):
+        combined |= values[:, position] << (21 - 3 * position)
+
+    packed = np.empty((len(values), 3), dtype=np.uint8)
+    packed[:, 0] = combined >> 16
+    packed[:, 1] = (combined >> 8) & 0xFF
+    packed[:, 2] = combined & 0xFF
+    return packed.reshape(-1)
+
+# pack_into writes the connect vectors of the cells at the given flat indexes into packed bytes that start out zeroed,
+# leaving the cells around them alone. The indexes have to be in increasing order; a group of 8 cells can be written
+# a few at a time, since each call only ORs its own cells' bits in
+def pack_into(packed: np.ndarray, indexes: np.ndarray, connect_vector: np.ndarray) -> None:
+    (groups, positions) = np.divmod(indexes, 8)
+    bits = (connect_vector.astype(np.uint32) + 1) << (21 - 3 * positions).astype(np.uint32)
+
+    # combine the cells of each group, then OR the groups into the bytes already there
+    (groups, starts) = np.unique(groups, return_index=True)
+    combined = np.bitwise_or.reduceat(bits, starts)
+    for (byte, shift) in ((0, 16), (1, 8), (2, 0)):
+        packed[groups * 3 + byte] |= ((combined >> shift) & 0xFF).astype(np.uint8)
+
+# unpack_directions turns packed bytes back into count connect vectors
+def unpack_directions(packed: np.ndarray, count) -> np.ndarray:
+    groups = np.asarray(packed[:-(-count // 8) * 3]).reshape(-1, 3).astype(np.uint32)
+    combined = (groups[:, 0] << 16) | (groups[:, 1] << 8) | groups[:, 2]
+
+    values = np.empty((len(groups), 8), dtype=np.int8)
+    for position in range(8):
+        values[:, position] = (combined >> (21 - 3 * position)) & 7
+    return values.reshape(-1)[:count] - 1
+
+# MazeFile is a loaded maze. The packed directions stay in the file when it is memory-mapped, and are only unpacked
+# when the whole connect vector array is asked for
+class MazeFile:
+
+    def __init__(self, shape, seed, generator_version, branch_prob, turn_prob, engine, packed: np.ndarray,
+                 fast_reseed=False, tiled=False, weighted=False, seeds=False) -> None:
+        self.shape = shape
+        self.seed = seed
+        self.generator_version = generator_version
+        self.branch_prob = branch_prob
+        self.turn_prob = turn_prob
+        self.engine = engine
+        self.packed = packed
+        self.fast_reseed = fast_reseed
+        self.tiled = tiled
+        self.weighted = weighted
+        self.seeds = seeds          # whether the maze grew from more than one seed
+
+    @property
+    def cell_count(self) -> int:
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    # connect_array unpacks the connect vector of every cell into an int8 array of the maze's shape
+    def connect_array(self) -> np.ndarray:
+        return unpack_directions(self.packed, self.cell_count).reshape(self.shape)
+
+    # direction_at reads the connect vector of a single cell straight from the packed bytes
+    def direction_at(self, i, j, k) -> int:
+        (group, position) = divmod((i * self.shape[1] + j) * self.shape[2] + k, 8)
+        (byte1, byte2, byte3) = (int(byte) for byte in self.packed[group * 3:group * 3 + 3])
+        return (((byte1 << 16 | byte2 << 8 | byte3) >> (21 - 3 * position)) & 7) - 1
+
+    # to_grid rebuilds a finished ArrayCellGrid from the maze
+    def to_grid(self, engine="scalar") -> cell.ArrayCellGrid:
+        cellgrid = cell.ArrayCellGrid(self.shape, engine=engine, seed=self.seed)
+        cellgrid.connect_vector[...] = self.connect_array()
+        cellgrid.state[...] = 3
+        cellgrid.rebuild_connections()
+        cellgrid.seed_present = False
+        cellgrid.finished = True
+        return cellgrid
+
+# pack_header builds the header of a maze file. Seeds that don't fit the header are left out rather than stored wrongly
+def pack_header(shape, seed, engine, flags, rules=cell.DEFAULT_RULES) -> bytes:
+    has_seed = isinstance(seed, int) and -2 ** 63 <= seed < 2 ** 63
+    flags |= FLAG_WEIGHTED if not rules.uniform else 0
+    return HEADER.pack(MAGIC, FORMAT_VERSION, cell.GENERATOR_VERSION, *shape, seed if has_seed else 0,
+                       rules.branch_prob, rules.turn_prob,
+                       cell.ENGINES.index(engine) if engine in cell.ENGINES else NO_ENGINE,
+                       flags | (FLAG_HAS_SEED if has_seed else 0))
+
+# save writes a finished grid to path
+def save(cellgrid: cell.CellGrid, path) -> None:
+    if not (cellgrid.state_array() == 3).all():
+        raise ValueError("only a finished maze can be saved")
+
+    flags = FLAG_FAST_RESEED if getattr(cellgrid, "fast_reseed", False) else 0
+    flags |= FLAG_SEEDS if cellgrid.seed_count > 1 else 0
+    header = pack_header(cellgrid.shape, cellgrid.seed, getattr(cellgrid, "engine", None), flags, cellgrid.rules)
+
+    connect_vector = cellgrid.connect_array().reshape(-1)
+    with open(path, "wb") as file:
+        file.write(header)
+        for start in range(0, len(connect_vector), PACK_BLOCK):
+            file.write(pack_directions(connect_vector[start:start + PACK_BLOCK]).tobytes())
+
+# create writes the header of a maze file of this shape and returns its packed directions memory-mapped for writing,
+# all zero, for a maze that is written a piece at a time with pack_into
+def create(path, shape, seed, engine, flags=0, rules=cell.DEFAULT_RULES) -> np.memmap:
+    size = -(-shape[0] * shape[1] * shape[2] // 8) * 3
+    with open(path, "wb") as file:
+        file.write(pack_header(shape, seed, engine, flags, rules))
+        file.truncate(HEADER_SIZE + size)
+    return np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER_SIZE, shape=(size,))
+
+# read_header reads and checks the header at the start of a maze file
+def read_header(file) -> tuple:
+    data = file.read(HEADER_SIZE)
+    if len(data) != HEADER_SIZE:
+        raise ValueError("file is too short to be a maze file")
+
+    (magic, format_version, *fields) = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("not a maze file")
+    if format_version > FORMAT_VERSION:
+        raise ValueError(f"maze file format {format_version} is newer than this program supports")
+    return tuple(fields)
+
+# load reads a maze file. With mmap the packed directions are mapped from the file rather than read into memory
+def load(path, mmap=True) -> MazeFile:
+    with open(path, "rb") as file:
+        (generator_version, depth, height, width, seed, branch_prob, turn_prob, engine, flags) = read_header(file)
+        size = -(-depth * height * width // 8) * 3
+        if not mmap:
+            packed = np.fromfile(file, dtype=np.uint8, count=size)
+
+    if mmap:
+        packed = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(size,))
+    if len(packed) != size:
+        raise ValueError("maze file is truncated")
+
+    return MazeFile((depth, height, width), seed if flags & FLAG_HAS_SEED else None, generator_version,
+                    branch_prob, turn_prob, cell.ENGINES[engine] if engine < len(cell.ENGINES) else None, packed,
+                    bool(flags & FLAG_FAST_RESEED), bool(flags & FLAG_TILED),
+                    bool(flags & FLAG_WEIGHTED), bool(flags & FLAG_SEEDS))
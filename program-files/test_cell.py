@@ -0,0 +1,52 @@
+import cell
+import numpy as np
+import pytest
+
+# Regression tests for the grids and their engines, run from the repository with python -m pytest
+
+# is_spanning_tree checks that following connect vectors from every cell ends at (0,0,0) without leaving the grid
+def is_spanning_tree(connect_vector: np.ndarray) -> bool:
+    flat = connect_vector.reshape(-1)
+    inside = cell.inside_mask(connect_vector.shape).reshape(-1)
+    has_parent = flat >= 0
+    if list(np.flatnonzero(~has_parent)) != [0]:
+        return False
+    if not (inside[has_parent] & (1 << flat[has_parent].astype(np.uint8))).all():
+        return False
+
+    parents = np.arange(flat.size)
+    parents[has_parent] += cell.direction_offsets(connect_vector.shape)[flat[has_parent]]
+    for _ in range(flat.size.bit_length() + 1):
+        parents = parents[parents]
+    return bool((parents == 0).all())
+
+# generate(seed=...) has to grow the same maze each time, even when the starting seeds are placed at random
+@pytest.mark.parametrize("engine", ["scalar", "vectorized", "frontier"])
+def test_generate_seed_reproducible_with_several_seeds(engine) -> None:
+    mazes = []
+    for _ in range(2):
+        cellgrid = cell.ArrayCellGrid((5, 6, 7), engine=engine, seeds=6)
+        cellgrid.generate(seed=7)
+        mazes.append(cellgrid.connect_vector)
+
+    built_with_seed = cell.ArrayCellGrid((5, 6, 7), engine=engine, seed=7, seeds=6)
+    built_with_seed.generate()
+    assert (mazes[0] == mazes[1]).all()
+    assert (mazes[0] == built_with_seed.connect_vector).all()
+    assert is_spanning_tree(mazes[0])
+
+# the frontier engine only skips cells that can't change, so it has to grow exactly the scalar engine's maze
+@pytest.mark.parametrize("shape", [(1, 1, 1), (1, 9, 13), (4, 4, 4), (3, 7, 5), (8, 8, 8)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_frontier_matches_scalar(shape, seed) -> None:
+    (scalar, frontier) = (cell.ArrayCellGrid(shape, engine=engine, seed=seed) for engine in ("scalar", "frontier"))
+    assert scalar.generate()[0] == frontier.generate()[0]
+    assert (scalar.connect_vector == frontier.connect_vector).all()
+    assert is_spanning_tree(frontier.connect_vector)
+
+# with branch_prob at 0 a grid that runs out of seeds never reseeds, so Rules turns it down
+@pytest.mark.parametrize("branch_prob", [0, -1, 101])
+def test_rules_reject_branch_prob_out_of_range(branch_prob) -> None:
+    with pytest.raises(ValueError):
+        cell.Rules(branch_prob=branch_prob)
+    assert cell.Rules(branch_prob=1).branch_prob == 1
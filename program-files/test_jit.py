@@ -0,0 +1,55 @@
+import cell
+import jit
+import os
+import pytest
+import subprocess
+import sys
+import warnings
+from test_cell import is_spanning_tree
+
+# The jit engine has to keep the automaton's invariants: every cell ends up connected and the connect vectors form a
+# spanning tree. Without numba the sweep is run as plain Python, which checks the same code numba would compile
+
+CASES = [((1, 1, 1), 1), ((1, 1, 9), 2), ((6, 7, 8), 1), ((5, 5, 5), 9), ((1, 12, 12), 1)]
+
+@pytest.mark.parametrize(("shape", "seeds"), CASES)
+def test_jit_engine_invariants(monkeypatch, shape, seeds) -> None:
+    monkeypatch.setattr(jit, "available", True)
+    cellgrid = cell.ArrayCellGrid(shape, engine="jit", seed=3, seeds=seeds)
+    assert cellgrid.engine == "jit"
+    cellgrid.generate()
+
+    assert (cellgrid.state == 3).all()
+    assert is_spanning_tree(cellgrid.connect_vector)
+    assert cellgrid.connection_count + 1 == cellgrid.state.size
+
+    again = cell.ArrayCellGrid(shape, engine="jit", seed=3, seeds=seeds)
+    again.generate()
+    assert (again.connect_vector == cellgrid.connect_vector).all()
+
+# weighted rules go through the cumulative table rather than the uniform pick
+def test_jit_engine_weighted_rules(monkeypatch) -> None:
+    monkeypatch.setattr(jit, "available", True)
+    cellgrid = cell.ArrayCellGrid((4, 6, 8), engine="jit", seed=5, rules=cell.Rules(20, 50, (3, 1, 1), 2))
+    cellgrid.generate()
+    assert (cellgrid.state == 3).all()
+    assert is_spanning_tree(cellgrid.connect_vector)
+
+# without numba the grid warns and runs the scalar engine instead
+def test_jit_engine_falls_back_without_numba(monkeypatch) -> None:
+    monkeypatch.setattr(jit, "available", False)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        cellgrid = cell.ArrayCellGrid(6, engine="jit", seed=1)
+    assert cellgrid.engine == "scalar"
+    assert any(issubclass(warning.category, RuntimeWarning) for warning in caught)
+
+    scalar = cell.ArrayCellGrid(6, engine="scalar", seed=1)
+    cellgrid.generate()
+    scalar.generate()
+    assert (cellgrid.connect_vector == scalar.connect_vector).all()
+
+# importing cell must not import jit.py, and with it numba, unless a grid asks for the jit engine
+def test_cell_import_leaves_jit_alone() -> None:
+    script = "import cell, sys; cell.ArrayCellGrid(4).generate(); sys.exit('jit' in sys.modules)"
+    subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(cell.__file__)), check=True)
@@ -0,0 +1,60 @@
+import cell
+import itertools
+import mazefile
+import numpy as np
+import pytest
+
+# Round trips through the packed maze file format. The shapes have 1, 7, 8, 9 and 105 cells, so the last group of
+# 8 cells is padded as well as full
+
+SHAPES = [(1, 1, 1), (1, 1, 7), (2, 2, 2), (1, 3, 3), (3, 5, 7)]
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, shape, mmap) -> None:
+    cellgrid = cell.ArrayCellGrid(shape, engine="frontier", seed=11)
+    cellgrid.generate()
+    path = tmp_path / "maze.camz"
+    mazefile.save(cellgrid, path)
+
+    maze = mazefile.load(path, mmap=mmap)
+    assert maze.shape == shape
+    assert maze.seed == 11
+    assert maze.engine == "frontier"
+    assert (maze.connect_array() == cellgrid.connect_vector).all()
+    for (i, j, k) in itertools.product(*(range(length) for length in shape)):
+        assert maze.direction_at(i, j, k) == cellgrid.connect_vector[i, j, k]
+    assert (maze.to_grid().connect_vector == cellgrid.connect_vector).all()
+
+# every connect vector value, in every position of a group of 8
+@pytest.mark.parametrize("count", [1, 7, 8, 9, 61])
+def test_pack_unpack_round_trip(count) -> None:
+    connect_vector = (np.arange(count) % 7 - 1).astype(np.int8)
+    packed = mazefile.pack_directions(connect_vector)
+    assert len(packed) == -(-count // 8) * 3
+    assert (mazefile.unpack_directions(packed, count) == connect_vector).all()
+
+# pack_into writes cells a few at a time, splitting groups of 8, and has to end up with the bytes pack_directions gives
+@pytest.mark.parametrize("count", [7, 9, 61])
+def test_pack_into_matches_pack_directions(count) -> None:
+    rng = np.random.default_rng(count)
+    connect_vector = rng.integers(-1, 6, size=count).astype(np.int8)
+    packed = np.zeros(-(-count // 8) * 3, dtype=np.uint8)
+    for indexes in np.array_split(np.arange(count), 5):
+        mazefile.pack_into(packed, indexes, connect_vector[indexes])
+    assert (packed == mazefile.pack_directions(connect_vector)).all()
+
+# a file written chunk by chunk through create and pack_into reads back as the whole maze
+def test_create_pack_into_load(tmp_path) -> None:
+    cellgrid = cell.ArrayCellGrid((3, 5, 7), engine="frontier", seed=5)
+    cellgrid.generate()
+    path = tmp_path / "maze.camz"
+    packed = mazefile.create(path, cellgrid.shape, 5, "frontier", mazefile.FLAG_TILED)
+    connect_vector = cellgrid.connect_vector.reshape(-1)
+    for indexes in np.array_split(np.arange(connect_vector.size), 4):
+        mazefile.pack_into(packed, indexes, connect_vector[indexes])
+    packed.flush()
+
+    maze = mazefile.load(path)
+    assert maze.tiled
+    assert (maze.connect_array() == cellgrid.connect_vector).all()
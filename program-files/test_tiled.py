@@ -0,0 +1,29 @@
+import math
+import mazefile
+import pytest
+import tiled
+from test_cell import is_spanning_tree
+
+# A tiled maze is only one maze if stitch joins every chunk to the ones before it, so the file has to read back as a
+# single spanning tree. The chunk shapes leave cut-down chunks at the far edges, and 1x1x1 chunks stitch every cell
+
+CASES = [((5, 7, 9), (2, 3, 4)), ((5, 7, 9), (1, 1, 1)), ((1, 6, 5), (1, 4, 2)), ((4, 4, 4), (4, 4, 4))]
+
+@pytest.mark.parametrize(("shape", "chunk_shape"), CASES)
+@pytest.mark.parametrize("seed", [0, 1])
+def test_tiled_maze_is_spanning_tree(tmp_path, shape, chunk_shape, seed) -> None:
+    path = tmp_path / "maze.camz"
+    report = tiled.generate_tiled(shape, chunk_shape, path, seed)
+    assert report.chunks == math.prod(-(-length // size) for (length, size) in zip(shape, chunk_shape))
+
+    maze = mazefile.load(path)
+    assert maze.tiled
+    assert maze.shape == shape
+    assert maze.seed == seed
+    assert is_spanning_tree(maze.connect_array())
+
+# the same seed grows the same tiled maze
+def test_tiled_maze_seed_reproducible(tmp_path) -> None:
+    for name in ("first.camz", "second.camz"):
+        tiled.generate_tiled((5, 7, 9), (2, 3, 4), tmp_path / name, 3)
+    assert (tmp_path / "first.camz").read_bytes() == (tmp_path / "second.camz").read_bytes()
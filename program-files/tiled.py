@@ -0,0 +1,98 @@
+import argparse
+import cell
+import itertools
+import mazefile
+import numpy as np
+import random
+import time
+
+# A tiled maze is grown one chunk at a time, in row-major chunk order, each chunk being an ordinary ArrayCellGrid of
+# its own. A finished chunk is a spanning tree of its cells, rooted at its first cell. To join it to the chunks
+# before it, the tree is re-rooted at a random cell on a face that borders an earlier chunk, and that cell is pointed
+# across the face. Every earlier chunk is already part of one tree rooted at (0,0,0), so the whole maze stays a
+# spanning tree. Only one chunk is in memory at a time; finished chunks go straight into the maze file.
+
+# chunk_seed gives each chunk its own seed, worked out from the maze's seed and the chunk's position in order
+def chunk_seed(seed, chunk_index) -> int:
+    return int(np.random.SeedSequence([seed, chunk_index]).generate_state(1, np.uint64)[0] >> 1)
+
+# stitch re-roots a finished chunk at a random cell on one of its faces that border earlier chunks, and points that
+# cell into the earlier chunk. position is the chunk's position among the chunks along each axis
+def stitch(chunk: cell.ArrayCellGrid, position) -> None:
+    # the backward directions: -z, -y and -x, each only usable when there is a chunk on that side
+    faces = [direction for (axis, direction) in enumerate((cell.DIRECTIONS.index(cell.UP),
+                                                           cell.DIRECTIONS.index(cell.NORTH),
+                                                           cell.DIRECTIONS.index(cell.WEST)))
+             if position[axis] > 0]
+    if not faces:
+        return
+
+    direction = chunk.rng.choice(faces)
+    axis = cell.DIRECTIONS[direction].index(-1)
+    coordinates = [chunk.rng.randrange(length) for length in chunk.shape]
+    coordinates[axis] = 0
+
+    connect_vector = chunk.connect_vector.reshape(-1)
+    index = int(np.ravel_multi_index(coordinates, chunk.shape))
+    cell.reroot(connect_vector, chunk.offsets, index)
+    connect_vector[index] = direction
+
+# TiledReport sums up a tiled generation
+class TiledReport:
+
+    def __init__(self, shape, chunk_shape, chunks, iterations, seconds) -> None:
+        self.shape = shape
+        self.chunk_shape = chunk_shape
+        self.chunks = chunks
+        self.iterations = iterations    # update_grid calls over all chunks
+        self.seconds = seconds
+
+    def __str__(self) -> str:
+        cells = self.shape[0] * self.shape[1] * self.shape[2]
+        return (f"{'x'.join(str(length) for length in self.shape)} maze in {self.chunks} chunks of "
+                f"{'x'.join(str(length) for length in self.chunk_shape)}: {self.iterations} iterations in "
+                f"{self.seconds:.3f}s ({cells / self.seconds if self.seconds > 0 else float('inf'):,.0f} cells/s)")
+
+# generate_tiled grows a maze of the given shape chunk by chunk and writes it to path as a maze file. Chunks at the
+# far edges are cut down to fit. Memory use depends on the chunk shape, not on the size of the maze
+def generate_tiled(shape, chunk_shape, path, seed=None, engine="frontier", rules=None) -> TiledReport:
+    shape = cell.grid_shape(shape)
+    chunk_shape = cell.grid_shape(chunk_shape)
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+
+    rules = rules or cell.DEFAULT_RULES
+    packed = mazefile.create(path, shape, seed, engine, mazefile.FLAG_TILED, rules)
+    counts = [-(-length // size) for (length, size) in zip(shape, chunk_shape)]
+    (height, width) = shape[1:]
+
+    iterations = 0
+    start = time.perf_counter()
+    for (chunk_index, position) in enumerate(itertools.product(*(range(count) for count in counts))):
+        origin = [index * size for (index, size) in zip(position, chunk_shape)]
+        size = tuple(min(size, length - first) for (size, length, first) in zip(chunk_shape, shape, origin))
+
+        chunk = cell.ArrayCellGrid(size, engine=engine, seed=chunk_seed(seed, chunk_index), rules=rules)
+        iterations += chunk.generate()[0]
+        stitch(chunk, position)
+
+        # the flat indexes of the chunk's cells in the whole maze come out in increasing order
+        (i, j, k) = np.ogrid[tuple(slice(first, first + length) for (first, length) in zip(origin, size))]
+        indexes = ((i * height + j) * width + k).astype(np.int64).reshape(-1)
+        mazefile.pack_into(packed, indexes, chunk.connect_vector.reshape(-1))
+
+    packed.flush()
+    return TiledReport(shape, chunk_shape, chunk_index + 1, iterations, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a maze chunk by chunk straight into a maze file.")
+    parser.add_argument("path", help="maze file to write")
+    parser.add_argument("--shape", type=int, nargs=3, required=True, metavar=("DEPTH", "HEIGHT", "WIDTH"))
+    parser.add_argument("--chunk", type=int, nargs=3, default=(32, 32, 32), metavar=("DEPTH", "HEIGHT", "WIDTH"),
+                        help="shape of the chunks the maze is grown in")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=cell.ENGINES, default="frontier")
+    args = parser.parse_args()
+
+    print(generate_tiled(args.shape, args.chunk, args.path, args.seed, args.engine))